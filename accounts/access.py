@@ -0,0 +1,137 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+
+from .models import Project, ProjectMember
+
+OWNER = 'owner'
+MEMBER = 'member'
+NO_PROJECT = 'no-project'
+
+
+class MembershipCache:
+    """
+    Process-local LRU of ``(project_id, profile_id) -> role``.
+
+    Entries are dropped by the signal handlers in ``accounts.signals`` when
+    membership or ownership changes, and expire after ``ttl`` seconds so
+    changes made through other worker processes are picked up as well.
+    """
+
+    def __init__(self, maxsize=4096, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._by_project = {}
+        self._lock = Lock()
+
+    def get(self, project_id, profile_id):
+        key = (project_id, profile_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            role, expires = entry
+            if expires < monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return role
+
+    def set(self, project_id, profile_id, role):
+        if self.maxsize <= 0:
+            return
+        key = (project_id, profile_id)
+        with self._lock:
+            self._entries[key] = (role, monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            self._by_project.setdefault(project_id, set()).add(profile_id)
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, project_id, profile_id=None):
+        with self._lock:
+            if profile_id is not None:
+                self._discard((project_id, profile_id))
+                return
+            for member_id in self._by_project.pop(project_id, ()):
+                self._entries.pop((project_id, member_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_project.clear()
+
+    def _discard(self, key):
+        self._entries.pop(key, None)
+        project_id, profile_id = key
+        profiles = self._by_project.get(project_id)
+        if profiles is not None:
+            profiles.discard(profile_id)
+            if not profiles:
+                del self._by_project[project_id]
+
+
+membership_cache = MembershipCache(
+    maxsize=getattr(settings, 'PROJECT_ACCESS_CACHE_SIZE', 4096),
+    ttl=getattr(settings, 'PROJECT_ACCESS_CACHE_TTL', 30),
+)
+
+
+def role_query(project_id, profile_id):
+    return (Project.objects.filter(pk=project_id)
+            .annotate(is_member=Exists(ProjectMember.objects.filter(project_id=OuterRef('pk'), member_id=profile_id)))
+            .values_list('owner_id', 'is_member'))
+
+
+def role_from_row(row, profile_id):
+    if row is None:
+        return NO_PROJECT
+    owner_id, is_member = row
+    if owner_id == profile_id:
+        return OWNER
+    return MEMBER if is_member else ''
+
+
+def fetch_project_role(project_id, profile_id):
+    return role_from_row(role_query(project_id, profile_id).first(), profile_id)
+
+
+async def afetch_project_role(project_id, profile_id):
+    return role_from_row(await role_query(project_id, profile_id).afirst(), profile_id)
+
+
+def project_role(request, project_id):
+    """
+    Role of the requesting profile in a project: ``OWNER``, ``MEMBER``,
+    ``''`` for no access or ``NO_PROJECT`` when the project does not exist.
+
+    The answer is memoized on the request, so the view, its serializers and
+    nested lookups share a single query.
+    """
+    project_id = int(project_id)
+    roles = request.__dict__.setdefault('_project_roles', {})
+    if project_id not in roles:
+        profile_id = request.user.profile.pk
+        role = membership_cache.get(project_id, profile_id)
+        if role is None:
+            role = fetch_project_role(project_id, profile_id)
+            membership_cache.set(project_id, profile_id, role)
+        roles[project_id] = role
+    return roles[project_id]
+
+
+async def aproject_role(request, profile_id, project_id):
+    """Async counterpart of ``project_role`` for views that resolved the profile themselves."""
+    project_id = int(project_id)
+    roles = request.__dict__.setdefault('_project_roles', {})
+    if project_id not in roles:
+        role = membership_cache.get(project_id, profile_id)
+        if role is None:
+            role = await afetch_project_role(project_id, profile_id)
+            membership_cache.set(project_id, profile_id, role)
+        roles[project_id] = role
+    return roles[project_id]
@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import ActivityEvent
+
+EXCERPT_LENGTH = 140
+
+
+def setting(name, default):
+    return getattr(settings, name, default)
+
+
+def excerpt(text):
+    return text if len(text) <= EXCERPT_LENGTH else text[:EXCERPT_LENGTH - 1] + '…'
+
+
+def event(project_id, verb, target_type, target_id, actor_id=None, data=None):
+    """An unsaved event, for callers that insert many with ``bulk_create``."""
+    return ActivityEvent(project_id=project_id, verb=verb, target_type=target_type, target_id=target_id,
+                         actor_id=actor_id, data=data or {})
+
+
+def record(project_id, verb, target_type, target_id, actor_id=None, data=None):
+    """
+    Append an event to the stream of a project.
+
+    An update replaces the previous update of the same target made less than
+    ``ACTIVITY_COALESCE_SECONDS`` ago, so a burst of edits leaves one event.
+    """
+    if project_id is None:
+        return None
+    if verb == ActivityEvent.UPDATED:
+        window = timedelta(seconds=setting('ACTIVITY_COALESCE_SECONDS', 300))
+        ActivityEvent.objects.filter(
+            target_type=target_type, target_id=target_id, verb=verb, project_id=project_id,
+            actor_id=actor_id, created_at__gte=timezone.now() - window,
+        ).delete()
+    instance = event(project_id, verb, target_type, target_id, actor_id, data)
+    instance.save()
+    return instance
+
+
+def trim(retention=None, max_per_project=None, batch_size=1000, now=None):
+    """
+    Delete events older than ``retention`` and, per project, all but the
+    newest ``max_per_project``. Deletes run in batches of ``batch_size``
+    rows to keep write locks short. Returns how many events were deleted.
+    """
+    retention = retention if retention is not None else timedelta(days=setting('ACTIVITY_RETENTION_DAYS', 90))
+    max_per_project = max_per_project or setting('ACTIVITY_MAX_EVENTS_PER_PROJECT', 10000)
+    deleted = delete_in_batches(
+        ActivityEvent.objects.filter(created_at__lt=(now or timezone.now()) - retention), batch_size)
+
+    crowded = (ActivityEvent.objects.values('project_id').annotate(events=Count('id'))
+               .filter(events__gt=max_per_project).values_list('project_id', flat=True))
+    for project_id in list(crowded):
+        events = ActivityEvent.objects.filter(project_id=project_id)
+        created_at, pk = events.order_by('-created_at', '-id').values_list('created_at', 'id')[max_per_project - 1]
+        older = Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        deleted += delete_in_batches(events.filter(older), batch_size)
+    return deleted
+
+
+def delete_in_batches(queryset, batch_size):
+    deleted = 0
+    while True:
+        pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += ActivityEvent.objects.filter(pk__in=pks).delete()[0]
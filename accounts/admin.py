@@ -1,4 +1,5 @@
 from django.contrib import admin
-from .models import Profile
+from .models import Job, Profile
 
-admin.site.register(Profile)
\ No newline at end of file
+admin.site.register(Profile)
+admin.site.register(Job)
\ No newline at end of file
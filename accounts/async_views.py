@@ -0,0 +1,184 @@
+import abc
+import asyncio
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import APIException, NotAuthenticated, NotFound, PermissionDenied
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .access import NO_PROJECT, aproject_role
+from .authentication import PROFILE_CLAIM, VERSION_CLAIM, ClaimsUser, acurrent_token_version
+from .broker import get_broker, project_channel, task_channel
+from .models import Profile, Project, ProjectMessage, TaskMessage
+from .pagination import AsyncKeysetPagination
+from .serializers import (
+    BoardSerializer, ProfileSerializer, ProjectMessageSerializer,
+    ProjectSerializer, TaskMessageSerializer
+)
+from .views import assemble_board, board_members, board_projects, board_tasks
+
+
+class AsyncReadView(abc.ABC, View):
+    """
+    Base of the ASGI-native read endpoints.
+
+    The request never leaves the event loop: the bearer token is validated
+    in-process (tokens with a profile claim need no profile query), the
+    profile and the rows are loaded with the async ORM, and
+    the rows are handed to the regular serializers fully loaded, so
+    rendering does no I/O. Errors keep DRF's ``{"detail": ...}`` shape.
+    """
+    http_method_names = ['get', 'head', 'options']
+    authentication = JWTAuthentication()
+    authentication_required = True
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            profile = await self.authenticate(request)
+            if profile is None and self.authentication_required:
+                raise NotAuthenticated()
+            data = await self.read(request, profile, **kwargs)
+        except APIException as exc:
+            return JsonResponse({'detail': exc.detail}, status=exc.status_code)
+        return JsonResponse(data, safe=False)
+
+    async def authenticate(self, request):
+        header = self.authentication.get_header(request)
+        raw_token = self.authentication.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        try:
+            validated = self.authentication.get_validated_token(raw_token)
+        except (InvalidToken, TokenError):
+            raise NotAuthenticated('Given token not valid for any token type')
+        profile_id = validated.get(PROFILE_CLAIM)
+        if profile_id is not None:
+            version = await acurrent_token_version(profile_id)
+            if version is None or validated.get(VERSION_CLAIM) != version:
+                raise NotAuthenticated('Token has been revoked')
+            return ClaimsUser(validated.get(jwt_settings.USER_ID_CLAIM), profile_id).profile
+        profile = await (Profile.objects.select_related('user')
+                         .filter(user_id=validated.get(jwt_settings.USER_ID_CLAIM), user__is_active=True)
+                         .afirst())
+        if profile is None:
+            raise NotAuthenticated('User not found')
+        return profile
+
+    async def check_project_member(self, request, profile, project_id):
+        role = await aproject_role(request, profile.pk, project_id)
+        if role == NO_PROJECT:
+            raise NotFound()
+        if not role:
+            raise PermissionDenied()
+
+    def get_serializer_context(self, request):
+        return {'request': request}
+
+    @abc.abstractmethod
+    async def read(self, request, profile, **kwargs):
+        """The response data for an authenticated (or anonymous, if allowed) request."""
+
+
+class AsyncProfileListView(AsyncReadView):
+    authentication_required = False
+    pagination = AsyncKeysetPagination('id')
+
+    async def read(self, request, profile):
+        queryset = ProfileSerializer.setup_eager_loading(Profile.objects.all())
+        rows, next_token = await self.pagination.paginate_queryset(queryset, request)
+        data = ProfileSerializer(rows, many=True, context=self.get_serializer_context(request)).data
+        return {'next': next_token, 'results': data}
+
+
+class AsyncProjectListView(AsyncReadView):
+    pagination = AsyncKeysetPagination('-created_at', '-id')
+
+    async def read(self, request, profile):
+        queryset = Project.objects.filter(Q(owner=profile) | Q(members=profile)).distinct()
+        rows, next_token = await self.pagination.paginate_queryset(queryset, request)
+        data = ProjectSerializer(rows, many=True, context=self.get_serializer_context(request)).data
+        return {'next': next_token, 'results': data}
+
+
+class AsyncProjectBoardView(AsyncReadView):
+    async def read(self, request, profile, project_id):
+        project = await board_projects(profile).filter(pk=project_id).afirst()
+        if project is None:
+            raise NotFound()
+        tasks = [task async for task in board_tasks(project.pk).aiterator()]
+        members = [member async for member in board_members(project.pk).aiterator()]
+        project = assemble_board(project, tasks, members)
+        return BoardSerializer(project, context=self.get_serializer_context(request)).data
+
+
+class AsyncMessageListView(AsyncReadView):
+    """
+    Messages oldest first. With ``?wait=<seconds>`` an empty page is held
+    open until a message event arrives on the broker (or the wait runs
+    out), so clients can long-poll with the ``since`` token of their last
+    page instead of polling in a tight loop.
+    """
+    serializer_class = None
+    pagination = AsyncKeysetPagination('time_create', 'id')
+
+    @abc.abstractmethod
+    def get_queryset(self, **kwargs):
+        """Messages of the URL's project or task."""
+
+    @abc.abstractmethod
+    def get_channel(self, **kwargs):
+        """Broker channel the messages of ``get_queryset`` are published on."""
+
+    def get_wait(self, request):
+        try:
+            wait = float(request.GET.get('wait', 0))
+        except ValueError:
+            return 0
+        return min(max(wait, 0), getattr(settings, 'ASYNC_LONG_POLL_SECONDS', 30))
+
+    async def read(self, request, profile, **kwargs):
+        await self.check_project_member(request, profile, kwargs['project_id'])
+        queryset = self.serializer_class.setup_eager_loading(self.get_queryset(**kwargs))
+        wait = self.get_wait(request)
+        # Subscribe before querying so an event between the query and the
+        # wait is not lost.
+        subscription = get_broker().subscribe(self.get_channel(**kwargs)) if wait else None
+        try:
+            rows, next_token = await self.pagination.paginate_queryset(queryset, request)
+            if not rows and subscription is not None:
+                try:
+                    await asyncio.wait_for(anext(subscription, None), wait)
+                except asyncio.TimeoutError:
+                    pass
+                else:
+                    rows, next_token = await self.pagination.paginate_queryset(queryset, request)
+        finally:
+            if subscription is not None:
+                subscription.close()
+        since = self.pagination.encode(rows[-1]) if rows else request.GET.get(self.pagination.since_query_param)
+        data = self.serializer_class(rows, many=True, context=self.get_serializer_context(request)).data
+        return {'next': next_token, 'since': since, 'results': data}
+
+
+class AsyncProjectMessageListView(AsyncMessageListView):
+    serializer_class = ProjectMessageSerializer
+
+    def get_queryset(self, project_id):
+        return ProjectMessage.objects.filter(project_id=project_id)
+
+    def get_channel(self, project_id):
+        return project_channel(project_id)
+
+
+class AsyncTaskMessageListView(AsyncMessageListView):
+    serializer_class = TaskMessageSerializer
+
+    def get_queryset(self, project_id, task_id):
+        return TaskMessage.objects.filter(task_id=task_id, task__status__project_id=project_id)
+
+    def get_channel(self, project_id, task_id):
+        return task_channel(task_id)
@@ -0,0 +1,177 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router, transaction
+from django.db.models import F
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow, datetime_from_epoch, datetime_to_epoch
+
+from .models import Profile
+
+PROFILE_CLAIM = 'profile_id'
+VERSION_CLAIM = 'ver'
+# When the session started, carried over to every rotated refresh token.
+LOGIN_CLAIM = 'auth_time'
+
+
+def version_key(profile_id):
+    return f'token-version:{profile_id}'
+
+
+def current_token_version(profile_id):
+    """
+    ``Profile.token_version`` through the cache, or None without a profile.
+
+    The cache is per process unless ``REDIS_URL`` is set, so entries expire
+    after ``TOKEN_VERSION_CACHE_SECONDS`` for revocations to reach every
+    process.
+    """
+    version = cache.get(version_key(profile_id))
+    if version is None:
+        version = Profile.objects.filter(pk=profile_id).values_list('token_version', flat=True).first()
+        if version is not None:
+            cache.set(version_key(profile_id), version, getattr(settings, 'TOKEN_VERSION_CACHE_SECONDS', 60))
+    return version
+
+
+async def acurrent_token_version(profile_id):
+    version = await cache.aget(version_key(profile_id))
+    if version is None:
+        version = await Profile.objects.filter(pk=profile_id).values_list('token_version', flat=True).afirst()
+        if version is not None:
+            await cache.aset(version_key(profile_id), version, getattr(settings, 'TOKEN_VERSION_CACHE_SECONDS', 60))
+    return version
+
+
+def is_revoked(token):
+    """Whether ``token``, which carries the profile claims, predates the profile's last ``revoke_tokens``."""
+    version = current_token_version(token[PROFILE_CLAIM])
+    return version is None or token.get(VERSION_CLAIM) != version
+
+
+def revoke_tokens(profile_id):
+    """Invalidate every token issued to a profile so far."""
+    Profile.objects.filter(pk=profile_id).update(token_version=F('token_version') + 1)
+    transaction.on_commit(lambda: cache.delete(version_key(profile_id)))
+
+
+def tokens_for_user(user, profile=None):
+    """Refresh and access tokens carrying the profile id and token version claims."""
+    profile = profile or user.profile
+    refresh = RefreshToken.for_user(user)
+    refresh[PROFILE_CLAIM] = profile.pk
+    refresh[VERSION_CLAIM] = profile.token_version
+    refresh[LOGIN_CLAIM] = refresh['iat']
+    return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+
+def refresh_tokens(raw_refresh):
+    """
+    A new access token for a refresh token, checked like an access token:
+    signature, expiry and the cached token version, with no user lookup.
+
+    Refresh tokens slide: once older than ``TOKEN_REFRESH_SLIDE_AFTER`` a
+    replacement is returned as well, until ``TOKEN_REFRESH_MAX_AGE`` after
+    the login. Refresh tokens issued without the claims are checked against
+    the user row once and replaced by ones that carry them.
+    """
+    refresh = RefreshToken(raw_refresh)
+    profile_id = refresh.get(PROFILE_CLAIM)
+    if profile_id is None:
+        user = (get_user_model()._default_manager.select_related('profile')
+                .filter(pk=refresh.get(jwt_settings.USER_ID_CLAIM), is_active=True).first())
+        profile = getattr(user, 'profile', None) if user is not None else None
+        if profile is None:
+            raise AuthenticationFailed('No active account found for the given token.', code='no_active_account')
+        return tokens_for_user(user, profile)
+
+    if is_revoked(refresh):
+        raise AuthenticationFailed('Token has been revoked', code='token_not_valid')
+    tokens = {'access': str(refresh.access_token)}
+
+    now = aware_utcnow()
+    slide_after = getattr(settings, 'TOKEN_REFRESH_SLIDE_AFTER', timedelta(hours=12))
+    if now - datetime_from_epoch(refresh['iat']) < slide_after:
+        return tokens
+    login = datetime_from_epoch(refresh.get(LOGIN_CLAIM, refresh['iat']))
+    expires = min(now + jwt_settings.REFRESH_TOKEN_LIFETIME,
+                  login + getattr(settings, 'TOKEN_REFRESH_MAX_AGE', timedelta(days=30)))
+    if expires > datetime_from_epoch(refresh['exp']):
+        refresh.set_jti()
+        refresh.set_iat(at_time=now)
+        refresh[LOGIN_CLAIM] = datetime_to_epoch(login)
+        refresh['exp'] = datetime_to_epoch(expires)
+        tokens['refresh'] = str(refresh)
+    return tokens
+
+
+class ClaimsUser:
+    """
+    ``request.user`` built from the claims of an access token.
+
+    ``pk``, ``profile`` and the authentication flags need no query;
+    ``profile`` is a ``Profile`` with every other field deferred, so it can
+    be used in filters and assigned to foreign keys as is, and reading any
+    other field loads the rest of the profile row in one query. Any other
+    attribute of the user loads the real user row once and is read from it.
+    """
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+
+    def __init__(self, user_id, profile_id):
+        self.id = self.pk = user_id
+        self.profile_id = profile_id
+
+    @cached_property
+    def profile(self):
+        profile = Profile.from_db(router.db_for_read(Profile), ['id', 'user_id'], [self.profile_id, self.pk])
+        profile._load_whole_row = True
+        return profile
+
+    @cached_property
+    def user(self):
+        return get_user_model()._default_manager.get(pk=self.pk)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __eq__(self, other):
+        return getattr(other, 'pk', None) == self.pk and getattr(other, 'is_authenticated', False)
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return str(self.user)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication without a per-request user lookup.
+
+    Tokens from ``tokens_for_user`` carry the profile id and the profile's
+    token version; the only check against stored state is the version,
+    read through the cache, so ``revoke_tokens`` locks a profile out.
+    Tokens without those claims go through the regular database lookup.
+    """
+
+    def get_user(self, validated_token):
+        profile_id = validated_token.get(PROFILE_CLAIM)
+        if profile_id is None:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise AuthenticationFailed('Token contained no recognizable user identification', code='token_not_valid')
+        if is_revoked(validated_token):
+            raise AuthenticationFailed('Token has been revoked', code='token_not_valid')
+        return ClaimsUser(user_id, profile_id)
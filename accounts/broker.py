@@ -0,0 +1,178 @@
+import asyncio
+import json
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """Events of one channel for one subscriber, consumed with ``async for``."""
+
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.maxsize = maxsize
+        self.queue = asyncio.Queue()
+        self.overflowed = False
+        self.closed = False
+
+    def deliver(self, event):
+        if self.closed:
+            return
+        if self.queue.qsize() >= self.maxsize:
+            # A subscriber that cannot keep up is cut off instead of slowing
+            # down delivery to everyone else.
+            self.overflowed = True
+            self.close()
+            return
+        self.queue.put_nowait(event)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.broker.unsubscribe(self)
+            self.queue.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        event = await self.queue.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+
+class InProcessBroker:
+    """
+    Fan-out within one process.
+
+    ``publish`` may be called from any thread and only schedules the event
+    on the event loop that owns the subscriptions, so its cost does not grow
+    with the number of subscribers; fan-out happens on the loop.
+    """
+    queue_size = 256
+
+    def __init__(self):
+        self.channels = {}
+        self.loop = None
+        self.lock = threading.Lock()
+
+    def subscribe(self, channel):
+        self.loop = asyncio.get_running_loop()
+        subscription = Subscription(self, channel, self.queue_size)
+        with self.lock:
+            self.channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.channels[subscription.channel]
+
+    def has_subscribers(self, channel):
+        return channel in self.channels
+
+    def publish(self, channel, event):
+        loop = self.loop
+        if loop is None or loop.is_closed() or channel not in self.channels:
+            return
+        loop.call_soon_threadsafe(self.fan_out, channel, event)
+
+    def fan_out(self, channel, event):
+        with self.lock:
+            subscribers = list(self.channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Fan-out across processes through Redis pub/sub (``REALTIME_REDIS_URL``
+    or ``REDIS_URL``). Each process keeps one Redis subscription per channel
+    and fans out to its local subscribers.
+    """
+
+    def __init__(self):
+        import redis
+        import redis.asyncio
+
+        super().__init__()
+        url = getattr(settings, 'REALTIME_REDIS_URL', None) or settings.REDIS_URL
+        self.publisher = redis.Redis.from_url(url)
+        self.subscriber = redis.asyncio.Redis.from_url(url).pubsub()
+        self.reader = None
+
+    def subscribe(self, channel):
+        first = channel not in self.channels
+        subscription = super().subscribe(channel)
+        if first:
+            asyncio.ensure_future(self.subscriber.subscribe(channel))
+        if self.reader is None:
+            self.reader = asyncio.ensure_future(self.read())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        super().unsubscribe(subscription)
+        if subscription.channel not in self.channels and self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(
+                asyncio.ensure_future, self.subscriber.unsubscribe(subscription.channel))
+
+    def has_subscribers(self, channel):
+        # Subscribers may be in any process, so ask Redis.
+        [(_, count)] = self.publisher.pubsub_numsub(channel)
+        return count > 0
+
+    def publish(self, channel, event):
+        self.publisher.publish(channel, json.dumps(event, cls=DjangoJSONEncoder))
+
+    async def read(self):
+        while True:
+            if not self.subscriber.subscribed:
+                await asyncio.sleep(0.1)
+                continue
+            message = await self.subscriber.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if message is not None:
+                self.fan_out(message['channel'].decode(), json.loads(message['data']))
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(getattr(settings, 'REALTIME_BROKER', 'accounts.broker.InProcessBroker'))()
+
+
+def project_channel(project_id):
+    return f'project:{project_id}'
+
+
+def task_channel(task_id):
+    return f'task:{task_id}'
+
+
+def access_channel(project_id):
+    """Channel telling open sockets of a project to check their access again."""
+    return f'access:{project_id}'
+
+
+def publish_on_commit(channel, make_event):
+    """
+    Publish ``make_event()`` on ``channel`` once the transaction commits,
+    building the event only if someone is subscribed to the channel.
+    """
+    def publish():
+        broker = get_broker()
+        if broker.has_subscribers(channel):
+            broker.publish(channel, make_event())
+
+    transaction.on_commit(publish, robust=True)
+
+
+def publish_access_changed(project_id):
+    publish_on_commit(access_channel(project_id), lambda: {'type': 'access.changed'})
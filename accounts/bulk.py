@@ -0,0 +1,213 @@
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import activity, caching, counters, search, storage, uploads
+from .access import membership_cache
+from .broker import get_broker, publish_access_changed, task_channel
+from .models import (
+    ActivityEvent, Profile, Project, ProjectMember, Status, Task, TaskFile, TaskMessage, UploadChunk, UploadSession,
+)
+from .serializers import BulkTaskOperationSerializer
+
+
+def apply_task_operations(project_id, creator, operations):
+    """
+    Validate and apply a batch of task operations for one project.
+
+    Every referenced status, performer and task is loaded with one query per
+    kind. Nothing is written unless all items are valid; the writes then run
+    in a single transaction with ``bulk_create``/``bulk_update`` and
+    ``delete_tasks``. Bulk writes skip model signals, so the search index, the
+    activity stream and cached responses of the project are refreshed
+    explicitly, and the counters are moved by the batch's deltas. Returns ``(results, applied)`` with one result per item.
+    """
+    results, items = [], []
+    for index, raw in enumerate(operations):
+        result = {'index': index, 'op': raw.get('op') if isinstance(raw, dict) else None}
+        item = BulkTaskOperationSerializer(data=raw)
+        if item.is_valid():
+            items.append(item.validated_data)
+        else:
+            result['errors'] = item.errors
+            items.append(None)
+        results.append(result)
+    valid = all(item is not None for item in items)
+    items = [item or {'op': None} for item in items]
+
+    status_ids = {item['status'] for item in items if 'status' in item}
+    performer_ids = {item['performer'] for item in items if item.get('performer') is not None}
+    task_ids = {item['id'] for item in items if item['op'] in ('move', 'reassign', 'delete')}
+
+    statuses = set(Status.objects.filter(project_id=project_id, pk__in=status_ids).values_list('pk', flat=True))
+    performers = set(Profile.objects.filter(pk__in=performer_ids)
+                     .filter(Q(owned_projects__id=project_id) | Q(joined_projects__id=project_id))
+                     .values_list('pk', flat=True))
+    tasks = Task.objects.filter(status__project_id=project_id).in_bulk(task_ids)
+
+    for result, item in zip(results, items):
+        errors = result.get('errors', {})
+        if 'status' in item and item['status'] not in statuses:
+            errors['status'] = 'Unknown status for this project.'
+        if item.get('performer') is not None and item['performer'] not in performers:
+            errors['performer'] = 'Performer is not a member of this project.'
+        if item['op'] in ('move', 'reassign', 'delete') and item['id'] not in tasks:
+            errors['id'] = 'Unknown task for this project.'
+        if errors:
+            result['errors'] = errors
+            valid = False
+    if not valid:
+        return results, False
+
+    now = timezone.now()
+    placed = {pk: (task.status_id, task.performer_id) for pk, task in tasks.items()}
+    created, changed, deleted = [], {}, set()
+    for result, item in zip(results, items):
+        op = item['op']
+        if op == 'create':
+            task = Task(creator=creator, name=item['name'], description=item.get('description', ''),
+                        soft_deadline=item['soft_deadline'], deadline=item['deadline'],
+                        status_id=item['status'], performer_id=item.get('performer'))
+            created.append((result, task))
+            continue
+        result['id'] = item['id']
+        if op == 'delete':
+            deleted.add(item['id'])
+            continue
+        task = tasks[item['id']]
+        if op == 'move':
+            task.status_id = item['status']
+        else:
+            task.performer_id = item['performer']
+        task.updated_at = now
+        changed[task.pk] = task
+
+    with transaction.atomic():
+        Task.objects.bulk_create([task for _, task in created], batch_size=500)
+        search.index_rows('task', [task.pk for _, task in created])
+        ActivityEvent.objects.bulk_create(
+            [activity.event(project_id, ActivityEvent.CREATED, 'task', task.pk, task.creator_id,
+                            {'name': task.name, 'status': task.status_id}) for _, task in created]
+            + [activity.event(project_id, ActivityEvent.UPDATED, 'task', task.pk, None,
+                              {'name': task.name, 'status': task.status_id})
+               for pk, task in changed.items() if pk not in deleted],
+            batch_size=500)
+        Task.objects.bulk_update([task for pk, task in changed.items() if pk not in deleted],
+                                 ['status', 'performer', 'updated_at'], batch_size=500)
+        messages = files = 0
+        if deleted:
+            messages, files = delete_tasks(deleted)
+        counters.tasks_moved(project_id, [
+            *((None, None, task.status_id, task.performer_id) for _, task in created),
+            *((*placed[pk], task.status_id, task.performer_id) for pk, task in changed.items() if pk not in deleted),
+            *((*placed[pk], None, None) for pk in deleted),
+        ])
+        counters.bump(Project.objects.filter(pk=project_id), message_count=-messages, file_count=-files)
+    caching.bump(*caching.project_audience(project_id))
+    for result, task in created:
+        result['id'] = task.pk
+    return results, True
+
+
+def delete_rows(queryset):
+    """
+    Delete the rows of ``queryset`` with one ``DELETE ... WHERE pk IN (...)``.
+
+    Unlike ``QuerySet.delete()`` nothing is collected first: no signals are
+    sent and no cascades run, so callers remove or detach dependent rows
+    themselves and refresh what the receivers would have maintained.
+    """
+    connection = connections[queryset.db]
+    quote, pk = connection.ops.quote_name, queryset.model._meta.pk
+    subquery, params = queryset.order_by().values(pk.attname).query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {quote(queryset.model._meta.db_table)} WHERE {quote(pk.column)} IN ({subquery})',
+                       params)
+        return cursor.rowcount
+
+
+def delete_tasks(task_ids):
+    """
+    Delete tasks with their messages, files and unfinished uploads in a
+    fixed number of queries, whatever their number.
+
+    This does what the cascade and the delete receivers would do row by row:
+    references from other messages are cleared, the search index and blob
+    reference counts are updated and message deletions are published. Counters
+    and cached responses are left to the caller, which refreshes them once.
+    Returns how many messages and files were deleted with the tasks.
+    """
+    messages = TaskMessage.objects.filter(task_id__in=task_ids)
+    files = TaskFile.objects.filter(task_id__in=task_ids)
+    message_rows = list(messages.values_list('pk', 'task_id'))
+    file_names = list(files.values_list('file', flat=True))
+    sessions = UploadSession.objects.filter(task_id__in=task_ids)
+    chunk_names = list(UploadChunk.objects.filter(session__in=sessions).values_list('name', flat=True))
+
+    others = TaskMessage.objects.exclude(task_id__in=task_ids)
+    others.filter(related_comment__task_id__in=task_ids).update(related_comment=None)
+    others.filter(related_file__task_id__in=task_ids).update(related_file=None)
+    # Sessions and chunks have no receivers, so this is a plain DELETE of each.
+    sessions.delete()
+    delete_rows(messages)
+    delete_rows(files)
+    delete_rows(Task.objects.filter(pk__in=task_ids))
+
+    search.remove_rows('task', list(task_ids))
+    search.remove_rows('task_message', [pk for pk, _ in message_rows])
+    storage.release_many(file_names)
+    transaction.on_commit(lambda: uploads.delete_files(chunk_names))
+    transaction.on_commit(lambda: publish_deleted_messages(message_rows), robust=True)
+    return len(message_rows), len(file_names)
+
+
+def publish_deleted_messages(message_rows):
+    broker = get_broker()
+    for pk, task_id in message_rows:
+        broker.publish(task_channel(task_id), {'type': 'message.deleted', 'message': {'id': pk}})
+
+
+def apply_member_changes(project_id, add=(), remove=()):
+    """
+    Add and remove project members by username.
+
+    The usernames are resolved with one ``IN`` query; unknown ones are
+    reported and otherwise ignored. New members are inserted with one
+    ``bulk_create`` that skips existing rows and leavers go with a single
+    ``DELETE``. Neither fires per-row signals, so the membership cache and
+    cached responses are invalidated once for the batch. Returns a dict of
+    the ``added``, ``removed`` and ``unknown`` usernames.
+    """
+    profiles = dict(Profile.objects.filter(user__username__in={*add, *remove})
+                    .values_list('user__username', 'pk'))
+    by_id = {pk: username for username, pk in profiles.items()}
+    add_ids = {profiles[name] for name in add if name in profiles}
+    remove_ids = {profiles[name] for name in remove if name in profiles}
+
+    with transaction.atomic():
+        members = ProjectMember.objects.filter(project_id=project_id)
+        existing = set(members.filter(member_id__in=add_ids | remove_ids).values_list('member_id', flat=True))
+        joining = add_ids - existing
+        leaving = remove_ids & existing
+        ProjectMember.objects.bulk_create(
+            [ProjectMember(project_id=project_id, member_id=pk) for pk in joining],
+            batch_size=500, ignore_conflicts=True)
+        ActivityEvent.objects.bulk_create(
+            [activity.event(project_id, ActivityEvent.CREATED, 'project_member', pk, data={'member': member_id})
+             for pk, member_id in members.filter(member_id__in=joining).values_list('pk', 'member_id')],
+            batch_size=500)
+        if leaving:
+            # A plain delete() would load the rows and signal each one.
+            delete_rows(members.filter(member_id__in=leaving))
+
+    if leaving:
+        publish_access_changed(project_id)
+    if joining or leaving:
+        membership_cache.invalidate(project_id)
+        caching.bump(*caching.project_audience(project_id),
+                     *(caching.user_projects_scope(pk) for pk in leaving))
+    return {
+        'added': sorted(by_id[pk] for pk in joining),
+        'removed': sorted(by_id[pk] for pk in leaving),
+        'unknown': sorted({*add, *remove} - profiles.keys()),
+    }
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.http import quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .conditional import etag_in
+from .models import Project, ProjectMember
+
+PROFILES = 'profiles'
+
+
+def generation_key(scope):
+    return f'response-cache:generation:{scope}'
+
+
+def user_projects_scope(profile_id):
+    return f'projects:{profile_id}'
+
+
+def bump(*scopes):
+    """
+    Invalidate every cached response depending on ``scopes``.
+
+    Cached responses embed the generation of their scopes in the key, so
+    writing a fresh generation orphans them without enumerating keys; the
+    orphans expire with ``RESPONSE_CACHE_TIMEOUT``.
+    """
+    if scopes:
+        generation = time.time_ns()
+        cache.set_many({generation_key(scope): generation for scope in scopes}, timeout=None)
+
+
+def project_audience(project_id, *extra_profile_ids):
+    members = ProjectMember.objects.filter(project_id=project_id).values_list('member_id', flat=True)
+    owners = Project.objects.filter(pk=project_id).values_list('owner_id', flat=True)
+    profile_ids = set(members) | set(owners) | {pk for pk in extra_profile_ids if pk is not None}
+    return [user_projects_scope(profile_id) for profile_id in profile_ids]
+
+
+def bump_projects_on_commit(project_ids):
+    """Invalidate the responses of everyone who sees ``project_ids`` once the transaction commits."""
+    project_ids = set(project_ids)
+    if project_ids:
+        transaction.on_commit(lambda: bump(*{
+            scope for project_id in project_ids for scope in project_audience(project_id)
+        }))
+
+
+def make_etag(data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return quote_etag(hashlib.md5(payload.encode(), usedforsecurity=False).hexdigest())
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    return bool(header) and etag_in(header, etag)
+
+
+class CachedResponseMixin:
+    """
+    Cache the serialized data of successful GET responses.
+
+    Views list the cache scopes they depend on in ``get_cache_scopes()``;
+    signal handlers bump those scopes when the underlying rows change.
+    Responses carry an ``ETag`` and a matching ``If-None-Match`` is answered
+    with 304 without serializing anything. Anything else a cached body
+    depends on, such as the validators of a ``ConditionalMixin`` in front of
+    it, is returned by ``get_cache_variants()`` and becomes part of the key.
+    """
+    cache_per_user = True
+
+    def get_cache_scopes(self):
+        return ()
+
+    def get_cache_variants(self):
+        return ()
+
+    def get_response_cache_key(self, request):
+        scopes = self.get_cache_scopes()
+        generations = cache.get_many([generation_key(scope) for scope in scopes])
+        missing = [generation_key(scope) for scope in scopes if generation_key(scope) not in generations]
+        if missing:
+            # Start unknown (never bumped or evicted) scopes at a fresh
+            # generation so they can never match an older cached entry.
+            for key in missing:
+                cache.add(key, time.time_ns(), timeout=None)
+            generations.update(cache.get_many(missing))
+        user = request.user.pk if self.cache_per_user and request.user.is_authenticated else 'anon'
+        variant = '|'.join([
+            request.get_host(), request.get_full_path(), request.META.get('HTTP_ACCEPT', ''),
+            *(str(generations.get(generation_key(scope), 0)) for scope in scopes),
+            *self.get_cache_variants(),
+        ])
+        digest = hashlib.md5(variant.encode(), usedforsecurity=False).hexdigest()
+        return f'response-cache:{type(self).__name__}:{user}:{digest}'
+
+    def get(self, request, *args, **kwargs):
+        key = self.get_response_cache_key(request)
+        cached = cache.get(key)
+        if cached is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            etag = make_etag(response.data)
+            cache.set(key, (response.data, etag), getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+        else:
+            data, etag = cached
+            response = Response(data)
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache' if self.cache_per_user else 'public, no-cache'
+        return response
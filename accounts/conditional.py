@@ -0,0 +1,86 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def etag_in(header, etag):
+    candidates = {candidate.strip().removeprefix('W/') for candidate in header.split(',')}
+    return '*' in candidates or etag in candidates
+
+
+class ConditionalMixin:
+    """
+    HTTP validators computed from one aggregate over the view's scoped
+    queryset: ``MAX(<last_modified_field>)`` and the row count.
+
+    GETs whose ``If-None-Match``/``If-Modified-Since`` still match are
+    answered with 304 before anything is serialized; PUT, PATCH and DELETE
+    with a stale ``If-Match`` get 412 instead of overwriting a newer row.
+    Lists get no ``Last-Modified``: deleting a row leaves the maximum
+    unchanged, so only the ETag, which includes the count, notices.
+    The validators of the current request are kept in ``self.validators``.
+    """
+    last_modified_field = 'updated_at'
+
+    def is_detail(self):
+        return (self.lookup_url_kwarg or self.lookup_field) in self.kwargs
+
+    def get_validator_queryset(self):
+        queryset = self.get_queryset()
+        if self.is_detail():
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[self.lookup_url_kwarg or self.lookup_field]})
+        return queryset
+
+    def get_validator_aggregates(self):
+        return {'last_modified': Max(self.last_modified_field), 'count': Count('pk')}
+
+    def get_validators(self, request):
+        values = self.get_validator_queryset().order_by().aggregate(**self.get_validator_aggregates())
+        last_modified = values['last_modified'] if self.is_detail() else None
+        fingerprint = '|'.join([request.get_full_path(), *(
+            value.isoformat() if hasattr(value, 'isoformat') else str(value)
+            for _, value in sorted(values.items())
+        )])
+        etag = quote_etag(hashlib.md5(fingerprint.encode(), usedforsecurity=False).hexdigest())
+        return etag, last_modified
+
+    def not_modified(self, request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            return etag_in(if_none_match, etag)
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        return bool(if_modified_since and last_modified and int(last_modified.timestamp()) <= if_modified_since)
+
+    def set_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.validators = self.get_validators(request)
+        if self.not_modified(request, etag, last_modified):
+            return self.set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            self.set_validators(response, etag, last_modified)
+        return response
+
+    def check_if_match(self, request):
+        if_match = request.META.get('HTTP_IF_MATCH')
+        if not if_match:
+            return None
+        etag, _ = self.get_validators(request)
+        if etag_in(if_match, etag):
+            return None
+        return Response({'detail': 'The resource has been modified since it was fetched.'},
+                        status=status.HTTP_412_PRECONDITION_FAILED)
+
+    def update(self, request, *args, **kwargs):
+        return self.check_if_match(request) or super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        return self.check_if_match(request) or super().destroy(request, *args, **kwargs)
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import re
+import time
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .access import NO_PROJECT, fetch_project_role
+from .authentication import PROFILE_CLAIM, is_revoked
+from .broker import access_channel, get_broker, project_channel, task_channel
+from .models import Profile, Task
+
+ROUTE = re.compile(r'^/ws/projects/(?P<project_id>\d+)/(?:tasks/(?P<task_id>\d+)/)?$')
+
+CLOSE_NOT_FOUND = 4404
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_FORBIDDEN = 4403
+CLOSE_TOO_SLOW = 4408
+
+
+def resolve(path):
+    match = ROUTE.match(path)
+    if match is None:
+        return None
+    task_id = match['task_id']
+    return int(match['project_id']), int(task_id) if task_id else None
+
+
+def access_token(scope):
+    """The validated ``?token=`` SimpleJWT access token; browsers cannot set headers on WebSockets."""
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+    if not token:
+        return None
+    try:
+        token = AccessToken(token)
+    except TokenError:
+        return None
+    return token if token.get(jwt_settings.USER_ID_CLAIM) is not None else None
+
+
+@sync_to_async
+def authorize(token, project_id, task_id):
+    # Checked like ClaimsJWTAuthentication does, so revoke_tokens closes sockets too.
+    if token.get(PROFILE_CLAIM) is not None and is_revoked(token):
+        return CLOSE_UNAUTHORIZED
+    profile_id = (Profile.objects.filter(user_id=token[jwt_settings.USER_ID_CLAIM], user__is_active=True)
+                  .values_list('pk', flat=True).first())
+    if profile_id is None:
+        return CLOSE_UNAUTHORIZED
+    role = fetch_project_role(project_id, profile_id)
+    if role == NO_PROJECT:
+        return CLOSE_NOT_FOUND
+    if not role:
+        return CLOSE_FORBIDDEN
+    if task_id is not None and not Task.objects.filter(pk=task_id, status__project_id=project_id).exists():
+        return CLOSE_NOT_FOUND
+    return None
+
+
+async def watch_access(token, target, changes):
+    """
+    Close code once the socket may no longer stream: the token expired, or
+    access was lost. Access is checked again on every event of ``changes``
+    and at least every ``WEBSOCKET_REAUTHORIZE_SECONDS``, for changes made
+    without signals.
+    """
+    interval = getattr(settings, 'WEBSOCKET_REAUTHORIZE_SECONDS', 300)
+    while True:
+        remaining = token['exp'] - time.time()
+        if remaining <= 0:
+            return CLOSE_UNAUTHORIZED
+        try:
+            await asyncio.wait_for(changes.queue.get(), min(interval, remaining))
+        except asyncio.TimeoutError:
+            if remaining <= interval:
+                continue
+        # One check covers every change queued meanwhile.
+        while not changes.queue.empty():
+            changes.queue.get_nowait()
+        close_code = await authorize(token, *target)
+        if close_code is not None:
+            return close_code
+
+
+async def websocket_application(scope, receive, send):
+    """
+    ASGI WebSocket endpoint streaming message events of a project
+    (``/ws/projects/<id>/``) or of a task (``/ws/projects/<id>/tasks/<id>/``).
+    The socket is closed when the token expires or access to the project is
+    lost.
+    """
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+
+    target = resolve(scope['path'])
+    token = access_token(scope)
+    if target is None:
+        close_code = CLOSE_NOT_FOUND
+    elif token is None:
+        close_code = CLOSE_UNAUTHORIZED
+    else:
+        close_code = await authorize(token, *target)
+    if close_code is not None:
+        await send({'type': 'websocket.close', 'code': close_code})
+        return
+
+    project_id, task_id = target
+    channel = task_channel(task_id) if task_id is not None else project_channel(project_id)
+    broker = get_broker()
+    subscription, changes = broker.subscribe(channel), broker.subscribe(access_channel(project_id))
+    await send({'type': 'websocket.accept'})
+
+    async def forward():
+        async for message in subscription:
+            await send({'type': 'websocket.send', 'text': json.dumps(message, cls=DjangoJSONEncoder)})
+        if subscription.overflowed:
+            await send({'type': 'websocket.close', 'code': CLOSE_TOO_SLOW})
+
+    async def listen():
+        while True:
+            event = await receive()
+            if event['type'] == 'websocket.disconnect':
+                return
+            if event.get('text') == 'ping':
+                await send({'type': 'websocket.send', 'text': 'pong'})
+
+    forwarding, listening = asyncio.ensure_future(forward()), asyncio.ensure_future(listen())
+    watching = asyncio.ensure_future(watch_access(token, target, changes))
+    tasks = (forwarding, listening, watching)
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        if watching.done() and not listening.done():
+            await send({'type': 'websocket.close', 'code': watching.result()})
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        subscription.close()
+        changes.close()
@@ -0,0 +1,72 @@
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Contact, Profile, Project, ProjectMember
+
+
+def contact_ids(profile_id):
+    return Contact.objects.filter(from_profile_id=profile_id).values('to_profile_id')
+
+
+def project_ids(profile_id):
+    """Projects the profile owns or is a member of, as a subquery."""
+    # An IN over the membership rows, not a join, keeps both sides of the OR
+    # on an index.
+    memberships = ProjectMember.objects.filter(member_id=profile_id).values('project_id')
+    return Project.objects.filter(Q(owner_id=profile_id) | Q(pk__in=memberships)).values('pk')
+
+
+def mutual_contacts(profile_id, other_id):
+    """Profiles in the contacts of both ``profile_id`` and ``other_id``."""
+    return (Profile.objects.filter(pk__in=contact_ids(profile_id))
+            .filter(pk__in=contact_ids(other_id)))
+
+
+def project_people(profile_id):
+    """Everyone sharing a project with ``profile_id`` who is not one of its contacts yet."""
+    projects = project_ids(profile_id)
+    return (Profile.objects
+            .filter(Q(pk__in=ProjectMember.objects.filter(project_id__in=projects).values('member_id'))
+                    | Q(pk__in=Project.objects.filter(pk__in=projects).values('owner_id')))
+            .exclude(pk=profile_id)
+            .exclude(pk__in=contact_ids(profile_id)))
+
+
+def suggestions(profile_id):
+    """
+    ``project_people`` ranked by how many projects they share with
+    ``profile_id`` (as members or owners), annotated as ``shared_projects``.
+    """
+    projects = project_ids(profile_id)
+
+    def shared(field):
+        return Coalesce(Subquery(
+            Project.objects.filter(**{field: OuterRef('pk')}, pk__in=projects).order_by()
+            .values(field).annotate(count=Count('pk')).values('count'),
+            output_field=IntegerField(),
+        ), Value(0))
+
+    return (project_people(profile_id)
+            .annotate(shared_projects=shared('members__id') + shared('owner_id'))
+            .order_by('-shared_projects', 'pk'))
+
+
+def import_contacts(profile_id, usernames):
+    """
+    Add the profiles of ``usernames`` to the contacts of ``profile_id``.
+
+    Usernames are resolved with one ``IN`` query and the rows inserted with
+    ``bulk_create``, skipping contacts that already exist. Returns a dict
+    of the ``added`` and ``unknown`` usernames; the profile's own name is
+    neither.
+    """
+    profiles = dict(Profile.objects.filter(user__username__in=set(usernames)).values_list('user__username', 'pk'))
+    with transaction.atomic():
+        existing = set(Contact.objects.filter(from_profile_id=profile_id, to_profile_id__in=profiles.values())
+                       .values_list('to_profile_id', flat=True))
+        added = {name: pk for name, pk in profiles.items() if pk not in existing and pk != profile_id}
+        Contact.objects.bulk_create(
+            [Contact(from_profile_id=profile_id, to_profile_id=pk) for pk in added.values()],
+            batch_size=500, ignore_conflicts=True)
+    return {'added': sorted(added), 'unknown': sorted(set(usernames) - profiles.keys())}
@@ -0,0 +1,187 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import (
+    PerformerCounter, Project, ProjectFile, ProjectMessage,
+    Status, Task, TaskFile, TaskMessage,
+)
+
+
+def bump(queryset, **deltas):
+    """Atomically add ``deltas`` to counter columns of every row in ``queryset``."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if deltas:
+        queryset.update(**{field: F(field) + delta for field, delta in deltas.items()})
+
+
+def bump_performer(project_id, performer_id, delta):
+    if performer_id is None or project_id is None or not delta:
+        return
+    counters = PerformerCounter.objects.filter(project_id=project_id, performer_id=performer_id)
+    if counters.update(task_count=F('task_count') + delta):
+        return
+    counter, created = PerformerCounter.objects.get_or_create(
+        project_id=project_id, performer_id=performer_id, defaults={'task_count': delta})
+    if not created:
+        bump(counters, task_count=delta)
+
+
+def task_project_ids(*status_ids):
+    status_ids = [status_id for status_id in status_ids if status_id is not None]
+    return dict(Status.objects.filter(pk__in=status_ids).values_list('id', 'project_id'))
+
+
+def task_moved(old_status_id, old_performer_id, new_status_id, new_performer_id, projects=None):
+    """
+    Apply the counter changes of a task moving between statuses and/or
+    performers. ``None`` on either side stands for a created/deleted task.
+    ``projects`` is the ``task_project_ids`` of both statuses, if known.
+    """
+    if (old_status_id, old_performer_id) == (new_status_id, new_performer_id):
+        return
+    if projects is None:
+        projects = task_project_ids(old_status_id, new_status_id)
+    old_project, new_project = projects.get(old_status_id), projects.get(new_status_id)
+    with transaction.atomic():
+        if old_status_id != new_status_id:
+            bump(Status.objects.filter(pk__in=[old_status_id]), task_count=-1)
+            bump(Status.objects.filter(pk__in=[new_status_id]), task_count=1)
+        if old_project != new_project:
+            bump(Project.objects.filter(pk__in=[old_project]), task_count=-1)
+            bump(Project.objects.filter(pk__in=[new_project]), task_count=1)
+        if (old_project, old_performer_id) != (new_project, new_performer_id):
+            bump_performer(old_project, old_performer_id, -1)
+            bump_performer(new_project, new_performer_id, 1)
+
+
+def by_delta(deltas):
+    """``{delta: [key, ...]}`` of the non-zero ``{key: delta}``, for one ``UPDATE`` per distinct delta."""
+    grouped = {}
+    for key, delta in deltas.items():
+        if delta:
+            grouped.setdefault(delta, []).append(key)
+    return grouped
+
+
+def bump_performers(project_id, deltas):
+    """``bump_performer`` for ``{performer_id: delta}``, creating missing counters in one query."""
+    grouped = by_delta(deltas)
+    if not grouped:
+        return
+    PerformerCounter.objects.bulk_create(
+        [PerformerCounter(project_id=project_id, performer_id=pk, task_count=0)
+         for pks in grouped.values() for pk in pks],
+        ignore_conflicts=True)
+    for delta, pks in grouped.items():
+        bump(PerformerCounter.objects.filter(project_id=project_id, performer_id__in=pks), task_count=delta)
+
+
+def tasks_moved(project_id, placements):
+    """
+    ``task_moved`` for many tasks of one project at once. ``placements``
+    yields ``(old_status_id, old_performer_id, new_status_id,
+    new_performer_id)``; the counters get one ``UPDATE`` per distinct delta
+    instead of one per task.
+    """
+    tasks, statuses, performers = 0, Counter(), Counter()
+    for old_status_id, old_performer_id, new_status_id, new_performer_id in placements:
+        tasks += (new_status_id is not None) - (old_status_id is not None)
+        if old_status_id != new_status_id:
+            statuses[old_status_id] -= 1
+            statuses[new_status_id] += 1
+        if old_performer_id != new_performer_id:
+            performers[old_performer_id] -= 1
+            performers[new_performer_id] += 1
+    statuses.pop(None, None)
+    performers.pop(None, None)
+    with transaction.atomic():
+        bump(Project.objects.filter(pk=project_id), task_count=tasks)
+        for delta, pks in by_delta(statuses).items():
+            bump(Status.objects.filter(pk__in=pks), task_count=delta)
+        bump_performers(project_id, performers)
+
+
+def projects_of_task(task_id):
+    return Project.objects.filter(statuses__statuses__id=task_id)
+
+
+def _count(model, field):
+    counts = (model.objects.filter(**{field: OuterRef('pk')})
+              .order_by().values(field).annotate(count=Count('pk')).values('count'))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def rebuild_counters(apply=True, project_ids=None):
+    """
+    Recount every counter (or those of ``project_ids``) from the source tables.
+
+    Returns a list of ``(label, stored, actual)`` tuples for every counter
+    that had drifted; with ``apply`` the stored values are corrected.
+    """
+    drift = []
+    projects, statuses = Project.objects.all(), Status.objects.all()
+    tasks, performer_counters = Task.objects.all(), PerformerCounter.objects.all()
+    if project_ids is not None:
+        projects = projects.filter(pk__in=project_ids)
+        statuses = statuses.filter(project_id__in=project_ids)
+        tasks = tasks.filter(status__project_id__in=project_ids)
+        performer_counters = performer_counters.filter(project_id__in=project_ids)
+
+    projects = projects.annotate(
+        actual_tasks=_count(Task, 'status__project'),
+        actual_messages=_count(ProjectMessage, 'project') + _count(TaskMessage, 'task__status__project'),
+        actual_files=_count(ProjectFile, 'project') + _count(TaskFile, 'task__status__project'),
+    ).only('id', 'task_count', 'message_count', 'file_count')
+    changed_projects = []
+    for project in projects.iterator():
+        changed = False
+        for field, actual in (('task_count', project.actual_tasks),
+                              ('message_count', project.actual_messages),
+                              ('file_count', project.actual_files)):
+            if getattr(project, field) != actual:
+                drift.append((f'project {project.pk} {field}', getattr(project, field), actual))
+                setattr(project, field, actual)
+                changed = True
+        if changed:
+            changed_projects.append(project)
+
+    statuses = statuses.annotate(actual_tasks=_count(Task, 'status')).only('id', 'task_count')
+    changed_statuses = []
+    for status in statuses.iterator():
+        if status.task_count != status.actual_tasks:
+            drift.append((f'status {status.pk} task_count', status.task_count, status.actual_tasks))
+            status.task_count = status.actual_tasks
+            changed_statuses.append(status)
+
+    actual_loads = {
+        (row['status__project'], row['performer']): row['count']
+        for row in (tasks.exclude(performer=None).order_by()
+                    .values('status__project', 'performer').annotate(count=Count('pk')))
+    }
+    stored_loads = {
+        (counter.project_id, counter.performer_id): counter
+        for counter in performer_counters
+    }
+    changed_loads, new_loads = [], []
+    for key in stored_loads.keys() | actual_loads.keys():
+        counter, actual = stored_loads.get(key), actual_loads.get(key, 0)
+        stored = counter.task_count if counter else 0
+        if stored == actual:
+            continue
+        drift.append((f'project {key[0]} performer {key[1]} task_count', stored, actual))
+        if counter is None:
+            new_loads.append(PerformerCounter(project_id=key[0], performer_id=key[1], task_count=actual))
+        else:
+            counter.task_count = actual
+            changed_loads.append(counter)
+
+    if apply:
+        with transaction.atomic():
+            Project.objects.bulk_update(changed_projects, ['task_count', 'message_count', 'file_count'], batch_size=500)
+            Status.objects.bulk_update(changed_statuses, ['task_count'], batch_size=500)
+            PerformerCounter.objects.bulk_update(changed_loads, ['task_count'], batch_size=500)
+            PerformerCounter.objects.bulk_create(new_loads, batch_size=500)
+    return drift
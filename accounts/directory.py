@@ -0,0 +1,66 @@
+import re
+import unicodedata
+
+from django.db.models import Exists, OuterRef, Q
+
+from .models import Profile, ProfileSearchTerm
+
+TERM = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+MAX_QUERY_WORDS = 4
+# Sorts after every character, closing the key range of a prefix.
+PREFIX_END = '\U0010ffff'
+
+
+def normalize(text):
+    """Casefolded words of ``text`` without diacritics: 'Zoë-Ann' -> ['zoe', 'ann']."""
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return [word[:MAX_TERM_LENGTH] for word in TERM.findall(stripped.casefold())]
+
+
+def terms_for(*names):
+    return {term for name in names for term in normalize(name or '')}
+
+
+def index_profiles(profile_ids):
+    """Replace the search terms of ``profile_ids`` with ones from their current names."""
+    profile_ids = list(profile_ids)
+    rows = Profile.objects.filter(pk__in=profile_ids).values_list('pk', 'user__username', 'first_name', 'last_name')
+    terms = [ProfileSearchTerm(profile_id=pk, term=term) for pk, *names in rows for term in terms_for(*names)]
+    ProfileSearchTerm.objects.filter(profile_id__in=profile_ids).delete()
+    ProfileSearchTerm.objects.bulk_create(terms, batch_size=1000)
+
+
+def rebuild(batch_size=1000):
+    """Index every profile; returns how many were indexed."""
+    ids = list(Profile.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), batch_size):
+        index_profiles(ids[start:start + batch_size])
+    return len(ids)
+
+
+def prefix(word):
+    return Q(term__gte=word, term__lt=word + PREFIX_END)
+
+
+def matches(query):
+    """
+    Search term rows of the profiles matching ``query``, one per profile.
+
+    Every word of the query must be a prefix of some word of the profile's
+    username or names. The longest word drives an index range scan over
+    ``(term, profile)``; a profile is represented by its first term in that
+    range, so results can be paged on ``(term, profile_id)`` without
+    duplicates. The other words are checked per row through the
+    ``(profile, term)`` index.
+    """
+    words = sorted(set(normalize(query)), key=len, reverse=True)[:MAX_QUERY_WORDS]
+    if not words:
+        return ProfileSearchTerm.objects.none()
+    first, rest = words[0], words[1:]
+    rows = ProfileSearchTerm.objects.filter(prefix(first)).exclude(Exists(
+        ProfileSearchTerm.objects.filter(prefix(first), profile_id=OuterRef('profile_id'), term__lt=OuterRef('term'))))
+    for word in rest:
+        rows = rows.filter(Exists(ProfileSearchTerm.objects.filter(prefix(word), profile_id=OuterRef('profile_id'))))
+    return rows
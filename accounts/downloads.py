@@ -0,0 +1,155 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+from .conditional import etag_in
+from .storage import digest_of
+from .streaming import is_asgi, streaming_content
+
+RANGE = re.compile(r'^bytes=(?P<start>\d*)-(?P<end>\d*)$')
+
+
+class RangeFile:
+    """
+    ``length`` bytes of ``file`` starting at ``start``.
+
+    ``read`` stops at the end of the range, and ``fileno`` exposes the
+    positioned descriptor so a ``wsgi.file_wrapper`` can still ``sendfile``
+    the range (it sends ``Content-Length`` bytes from the current offset).
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(fieldfile, size, modified):
+    digest = digest_of(fieldfile.name)
+    return quote_etag(digest if digest else f'{size:x}-{int(modified.timestamp()):x}')
+
+
+def parse_range(header, size):
+    """
+    ``(start, end)`` (inclusive) of a single ``bytes=`` range, ``None`` when
+    the header should be ignored, or ``False`` when it cannot be satisfied.
+    """
+    match = RANGE.match(header.strip())
+    if match is None or not (match['start'] or match['end']):
+        return None
+    if match['start']:
+        start = int(match['start'])
+        end = min(int(match['end']), size - 1) if match['end'] else size - 1
+        if start > end:
+            return False
+    else:
+        suffix = int(match['end'])
+        if not suffix:
+            return False
+        start, end = max(size - suffix, 0), size - 1
+    if start >= size:
+        return False
+    return start, end
+
+
+def if_range_matches(request, etag, modified):
+    header = request.META.get('HTTP_IF_RANGE')
+    if not header:
+        return True
+    if header.startswith(('"', 'W/')):
+        return header == etag
+    since = parse_http_date_safe(header)
+    return since is not None and int(modified.timestamp()) <= since
+
+
+def accelerated_response(fieldfile, mode):
+    response = HttpResponse()
+    # The proxy fills in the body, length and ranges; an empty Content-Type
+    # lets it pick one from the path.
+    del response['Content-Type']
+    if mode == 'nginx':
+        prefix = getattr(settings, 'FILE_DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(fieldfile.name)
+    else:
+        response['X-Sendfile'] = fieldfile.path
+    return response
+
+
+def serve_file(request, fieldfile, filename=None):
+    """
+    Response delivering ``fieldfile`` to a client already allowed to read it.
+
+    With ``FILE_DOWNLOAD_ACCEL`` set to ``'nginx'`` or ``'sendfile'`` the
+    transfer is handed to the front proxy through ``X-Accel-Redirect`` or
+    ``X-Sendfile``. Otherwise the file is streamed with ``FileResponse``
+    (zero-copy where the server provides ``wsgi.file_wrapper``, chunk by
+    chunk from a thread under ASGI), honouring single ``Range`` requests,
+    ``If-Range`` and ``If-None-Match``.
+    """
+    filename = filename or os.path.basename(fieldfile.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    mode = getattr(settings, 'FILE_DOWNLOAD_ACCEL', None)
+    if mode:
+        response = accelerated_response(fieldfile, mode)
+    else:
+        storage = fieldfile.storage
+        size, modified = storage.size(fieldfile.name), storage.get_modified_time(fieldfile.name)
+        etag = file_etag(fieldfile, size, modified)
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and etag_in(if_none_match, etag):
+            response = HttpResponse(status=304)
+        else:
+            response = ranged_response(request, fieldfile, size, etag, modified, content_type)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(modified.timestamp())
+        response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def ranged_response(request, fieldfile, size, etag, modified, content_type):
+    byte_range = None
+    if request.META.get('HTTP_RANGE') and if_range_matches(request, etag, modified):
+        byte_range = parse_range(request.META['HTTP_RANGE'], size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        response = file_response(request, fieldfile.storage.open(fieldfile.name, 'rb'), content_type=content_type)
+        response['Content-Length'] = size
+        return response
+    start, end = byte_range
+    response = file_response(request, RangeFile(fieldfile.storage.open(fieldfile.name, 'rb'), start, end - start + 1),
+                             content_type=content_type, status=206)
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+def file_response(request, file, **kwargs):
+    response = FileResponse(file, **kwargs)
+    if is_asgi(request):
+        # Django reads a sync iterator into memory before sending it under
+        # ASGI; the file itself is still closed with the response.
+        response.streaming_content = streaming_content(request, iter(lambda: file.read(response.block_size), b''))
+    return response
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    Django's PBKDF2-SHA256 hasher with the iteration count taken from
+    ``PASSWORD_PBKDF2_ITERATIONS``.
+
+    The algorithm name is unchanged, so stored hashes stay readable by the
+    stock hasher; a hash with another count is rehashed with the configured
+    one on the next successful login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', hashers.PBKDF2PasswordHasher.iterations)
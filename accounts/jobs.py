@@ -0,0 +1,235 @@
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# name -> (function, options) of everything decorated with @task.
+TASKS = {}
+
+
+def setting(name, default):
+    return getattr(settings, name, default)
+
+
+def task(function=None, *, queue='default', max_attempts=None):
+    """
+    Register ``function`` as a job. The function gets ``delay(*args,
+    **kwargs)`` to enqueue it; arguments must be JSON serializable, and the
+    function may run more than once for one job, so it must be idempotent.
+    """
+    def register(function):
+        name = f'{function.__module__}.{function.__qualname__}'
+        TASKS[name] = (function, {'queue': queue, 'max_attempts': max_attempts})
+        function.delay = lambda *args, **kwargs: enqueue(name, *args, **kwargs)
+        return function
+
+    return register(function) if function is not None else register
+
+
+def resolve(name):
+    if name not in TASKS:
+        # Registered when its module is imported; the worker may not have yet.
+        import_string(name)
+    return TASKS[name]
+
+
+def enqueue(name, *args, idempotency_key=None, delay=None, queue=None, max_attempts=None, **kwargs):
+    """
+    Queue the job ``name`` and return its row.
+
+    The row is written in the current transaction, so workers only see the
+    job once that transaction commits and never if it rolls back. With an
+    ``idempotency_key`` that was already used the existing job is returned
+    instead of queueing another one.
+    """
+    _, options = resolve(name)
+    job = Job(
+        name=name, args=list(args), kwargs=kwargs, idempotency_key=idempotency_key,
+        queue=queue or options['queue'],
+        max_attempts=max_attempts or options['max_attempts'] or setting('JOB_MAX_ATTEMPTS', 5),
+        run_at=timezone.now() + (delay or timedelta()),
+    )
+    if idempotency_key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        return Job.objects.get(idempotency_key=idempotency_key)
+    return job
+
+
+def retry_delay(attempts):
+    """Exponential backoff with up to 50% jitter, capped at ``JOB_RETRY_MAX_DELAY``."""
+    base = setting('JOB_RETRY_DELAY', 10) * 2 ** (attempts - 1)
+    delay = min(base, setting('JOB_RETRY_MAX_DELAY', 3600))
+    return timedelta(seconds=delay * random.uniform(1, 1.5))
+
+
+def claim(worker_id, queues=None, limit=1):
+    """
+    Lock up to ``limit`` due jobs for ``worker_id``.
+
+    Each job is taken with a conditional ``UPDATE``, so concurrent workers on
+    any database never both get the same job. Running jobs whose lock expired
+    (their worker died) are taken over.
+    """
+    now = timezone.now()
+    due = Job.objects.filter(Q(status=Job.QUEUED, run_at__lte=now) | Q(status=Job.RUNNING, locked_until__lt=now))
+    if queues:
+        due = due.filter(queue__in=queues)
+    claimed = []
+    for pk in due.order_by('run_at', 'id').values_list('pk', flat=True)[:limit * 2]:
+        locked = Job.objects.filter(pk=pk).filter(
+            Q(status=Job.QUEUED) | Q(status=Job.RUNNING, locked_until__lt=now)
+        ).update(status=Job.RUNNING, locked_by=worker_id, attempts=F('attempts') + 1,
+                 locked_until=now + timedelta(seconds=setting('JOB_LOCK_TIMEOUT', 300)))
+        if locked:
+            claimed.append(Job.objects.get(pk=pk))
+            if len(claimed) == limit:
+                break
+    return claimed
+
+
+def execute(job):
+    """Run a claimed job and record the outcome: done, retried later, or failed."""
+    mine = Job.objects.filter(pk=job.pk, locked_by=job.locked_by, status=Job.RUNNING)
+    try:
+        function, _ = resolve(job.name)
+        function(*job.args, **job.kwargs)
+    except Exception:
+        logger.exception('Job %s (%s) failed on attempt %s', job.pk, job.name, job.attempts)
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            record(mine, status=Job.QUEUED, run_at=timezone.now() + retry_delay(job.attempts),
+                   locked_by='', locked_until=None, last_error=error)
+        else:
+            record(mine, status=Job.FAILED, finished_at=timezone.now(),
+                   locked_by='', locked_until=None, last_error=error)
+        return False
+    record(mine, status=Job.DONE, finished_at=timezone.now(), locked_by='', locked_until=None)
+    return True
+
+
+def record(queryset, attempts=3, **fields):
+    # The job has run by now; a write refused by a busy (SQLite) database is
+    # retried briefly rather than left to the lock timeout, which would run
+    # the job again.
+    for attempt in range(1, attempts + 1):
+        try:
+            return queryset.update(**fields)
+        except OperationalError:
+            if attempt == attempts:
+                raise
+            time.sleep(0.05 * attempt)
+
+
+def work_off(queues=None, limit=None, worker_id=None):
+    """Run due jobs one by one in the calling thread until none are left; returns how many ran."""
+    worker_id = worker_id or default_worker_id()
+    count = 0
+    while limit is None or count < limit:
+        jobs = claim(worker_id, queues)
+        if not jobs:
+            break
+        execute(jobs[0])
+        count += 1
+    return count
+
+
+def purge(older_than=None):
+    """Delete finished jobs, freeing their idempotency keys."""
+    older_than = older_than if older_than is not None else timedelta(seconds=setting('JOB_RETENTION', 7 * 24 * 3600))
+    deleted, _ = Job.objects.filter(status__in=[Job.DONE, Job.FAILED],
+                                    finished_at__lt=timezone.now() - older_than).delete()
+    return deleted
+
+
+def due(queues=None):
+    jobs = Job.objects.filter(status=Job.QUEUED, run_at__lte=timezone.now())
+    return (jobs.filter(queue__in=queues) if queues else jobs).exists()
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+class Worker:
+    """
+    Polls the queue and runs up to ``concurrency`` jobs at a time on a thread
+    pool. Several workers (processes or hosts) can share a database.
+    """
+
+    def __init__(self, queues=None, concurrency=None, poll_interval=None):
+        self.queues = queues
+        self.concurrency = concurrency or setting('JOB_CONCURRENCY', 4)
+        self.poll_interval = poll_interval if poll_interval is not None else setting('JOB_POLL_INTERVAL', 1)
+        self.id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+        self.idle = threading.Condition()
+        self.active = 0
+
+    def stop(self, *args):
+        self.stopping.set()
+        with self.idle:
+            self.idle.notify_all()
+
+    def run(self, burst=False):
+        """Work until ``stop`` is called, or with ``burst`` until no job is due."""
+        purge()
+        last_purge = timezone.now()
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix='jobs') as pool:
+            while not self.stopping.is_set():
+                with self.idle:
+                    while self.active >= self.concurrency and not self.stopping.is_set():
+                        self.idle.wait()
+                    free = self.concurrency - self.active
+                if self.stopping.is_set():
+                    break
+                jobs = claim(self.id, self.queues, free)
+                for job in jobs:
+                    with self.idle:
+                        self.active += 1
+                    pool.submit(self.execute, job)
+                if jobs:
+                    continue
+                if burst:
+                    with self.idle:
+                        while self.active:
+                            self.idle.wait()
+                    if not due(self.queues):
+                        break
+                    continue
+                if timezone.now() - last_purge > timedelta(hours=1):
+                    purge()
+                    last_purge = timezone.now()
+                self.stopping.wait(self.poll_interval)
+        connections.close_all()
+
+    def execute(self, job):
+        try:
+            execute(job)
+        except Exception:
+            # Recording the outcome failed; the lock expires and the job is retried.
+            logger.exception('Could not record the outcome of job %s', job.pk)
+        finally:
+            connections.close_all()
+            with self.idle:
+                self.active -= 1
+                self.idle.notify_all()
@@ -0,0 +1,141 @@
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, resolve, reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts import urls
+from accounts.access import membership_cache
+from accounts.authentication import tokens_for_user
+from accounts.models import (
+    Profile, Project, ProjectFile, ProjectMember, ProjectMessage,
+    Status, Task, TaskFile, TaskMessage, UploadSession
+)
+
+# The fixture each route's ``pk`` refers to.
+PK_OF = {
+    'profile-avatar': 'profile',
+    'project-detail': 'project',
+    'status-detail': 'status',
+    'task-detail': 'task',
+    'project-message-detail': 'project_message',
+    'task-message-detail': 'task_message',
+    'project-file-detail': 'project_file',
+    'task-file-detail': 'task_file',
+    'upload-detail': 'upload',
+}
+# Writes whose response serializes the requesting profile, and their bodies.
+POSTS = {
+    'project-message-list': {'content': 'bench'},
+    'task-message-list': {'content': 'bench'},
+}
+# Routes without a GET, or whose GET needs stored file content.
+SKIPPED = {
+    'register', 'login', 'token-refresh', 'task-bulk', 'project-member-bulk', 'contact-create-delete',
+    'contact-import', 'upload-chunk', 'upload-complete',
+    'project-file-download', 'task-file-download',
+}
+
+
+class Command(BaseCommand):
+    help = ('Count the queries every GET endpoint (and the POSTs in POSTS) runs with a token that needs '
+            'the user looked up and with one carrying the profile claims (see accounts/authentication.py).')
+
+    def handle(self, *args, **options):
+        # Fixtures and whatever the requests write are rolled back.
+        with transaction.atomic():
+            fixtures = self.create_fixtures()
+            tokens = {
+                'lookup': str(AccessToken.for_user(fixtures['profile'].user)),
+                'claims': tokens_for_user(fixtures['profile'].user)['access'],
+            }
+            rows = []
+            for pattern in urls.urlpatterns:
+                if not isinstance(pattern, URLPattern) or pattern.name in SKIPPED:
+                    continue
+                path = reverse(pattern.name, kwargs=self.kwargs(pattern, fixtures))
+                counts = {mode: self.count(path, token) for mode, token in tokens.items()}
+                rows.append((pattern.name, counts['lookup'], counts['claims']))
+                if pattern.name in POSTS:
+                    counts = {mode: self.count(path, token, POSTS[pattern.name]) for mode, token in tokens.items()}
+                    rows.append((f'{pattern.name} POST', counts['lookup'], counts['claims']))
+            transaction.set_rollback(True)
+
+        width = max(len(name) for name, *_ in rows)
+        self.stdout.write(f'{"route":<{width}}  {"status":>6}  {"lookup":>6}  {"claims":>6}')
+        for name, (status, lookup), (_, claims) in rows:
+            self.stdout.write(f'{name:<{width}}  {status:>6}  {lookup:>6}  {claims:>6}')
+        lookup = sum(row[1][1] for row in rows)
+        claims = sum(row[2][1] for row in rows)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(rows)} routes: {lookup} queries with the user lookup, {claims} with claims '
+            f'({lookup - claims} saved, {(lookup - claims) / max(lookup, 1):.0%}).'
+        ))
+
+    def create_fixtures(self):
+        now = timezone.now()
+        profile = Profile.objects.create(user=User.objects.create(username='bench-auth-owner'), first_name='Bench')
+        member = Profile.objects.create(user=User.objects.create(username='bench-auth-member'), first_name='Member')
+        project = Project.objects.create(owner=profile, name='Bench project', soft_deadline=now,
+                                         deadline=now + timedelta(days=7))
+        ProjectMember.objects.create(member=member, project=project)
+        status = Status.objects.create(project=project, name='Todo')
+        task = Task.objects.create(status=status, creator=profile, performer=member, name='Bench task',
+                                   soft_deadline=now, deadline=now + timedelta(days=1))
+        return {
+            'profile': profile,
+            'member': member,
+            'project': project,
+            'status': status,
+            'task': task,
+            'project_message': ProjectMessage.objects.create(project=project, author=member, content='hello'),
+            'task_message': TaskMessage.objects.create(task=task, author=member, content='hello'),
+            'project_file': ProjectFile.objects.create(project=project, file='project_files/bench.pdf'),
+            'task_file': TaskFile.objects.create(task=task, file='task_files/bench.pdf'),
+            'upload': UploadSession.objects.create(owner=profile, project=project, filename='bench.bin',
+                                                   size=1, chunk_size=1),
+        }
+
+    def kwargs(self, pattern, fixtures):
+        values = {
+            'project_id': fixtures['project'].pk,
+            'task_id': fixtures['task'].pk,
+            'size': 48,
+            'username': fixtures['member'].user.username,
+            'pk': fixtures[PK_OF[pattern.name]].pk if pattern.name in PK_OF else None,
+        }
+        return {name: values[name] for name in pattern.pattern.converters}
+
+    def count(self, path, token, data=None):
+        """Status and query count of a GET, or of a POST of ``data``, once the caches are warm."""
+        host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+        factory = RequestFactory(HTTP_HOST=host, HTTP_AUTHORIZATION=f'Bearer {token}')
+        match = resolve(path)
+        membership_cache.clear()
+        cache.clear()
+        self.request(factory, path, match, data)
+        with CaptureQueriesContext(connection) as queries:
+            status = self.request(factory, path, match, data)
+        return status, len(queries)
+
+    def request(self, factory, path, match, data):
+        request = factory.get(path) if data is None else factory.post(path, data, content_type='application/json')
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, '__await__'):
+            response = async_to_sync(self.wait)(response)
+        if hasattr(response, 'render'):
+            response.render()
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response.status_code
+
+    async def wait(self, response):
+        return await response
@@ -0,0 +1,84 @@
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from project_management.database import SQLITE_BUSY_TIMEOUT, SQLITE_PRAGMAS
+
+SCHEMA = (
+    'CREATE TABLE message (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER NOT NULL, '
+    'author_id INTEGER NOT NULL, content TEXT NOT NULL, time_create TEXT NOT NULL)',
+    'CREATE INDEX message_project_time ON message (project_id, time_create, id)',
+)
+
+MODES = {
+    # What the project ran with before: rollback journal, FULL sync,
+    # deferred transactions and the sqlite3 module's 5 second timeout.
+    'default': {'pragmas': (), 'timeout': 5, 'begin': 'BEGIN'},
+    'tuned': {'pragmas': SQLITE_PRAGMAS, 'timeout': SQLITE_BUSY_TIMEOUT, 'begin': 'BEGIN IMMEDIATE'},
+}
+
+
+class Command(BaseCommand):
+    help = 'Measure concurrent message-insert throughput on SQLite with the default and the tuned settings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=250, help='Inserts per thread.')
+        parser.add_argument('--mode', choices=sorted(MODES), action='append',
+                            help='Run only the given mode(s).')
+
+    def handle(self, *args, threads, writes, mode, **options):
+        for name in mode or sorted(MODES):
+            with tempfile.TemporaryDirectory() as directory:
+                committed, failed, elapsed = self.run(Path(directory) / 'bench.sqlite3', MODES[name], threads, writes)
+            self.stdout.write(
+                f'{name:>8}: {committed} writes in {elapsed:.2f}s '
+                f'({committed / elapsed:.0f} writes/s), {failed} failed with "database is locked"'
+            )
+
+    def connect(self, path, mode):
+        connection = sqlite3.connect(path, timeout=mode['timeout'], isolation_level=None, check_same_thread=False)
+        for pragma in mode['pragmas']:
+            connection.execute(pragma)
+        return connection
+
+    def run(self, path, mode, threads, writes):
+        setup = self.connect(path, mode)
+        for statement in SCHEMA:
+            setup.execute(statement)
+        setup.close()
+
+        committed, failed = [0] * threads, [0] * threads
+        barrier = threading.Barrier(threads + 1)
+
+        def writer(index):
+            connection = self.connect(path, mode)
+            barrier.wait()
+            for i in range(writes):
+                try:
+                    connection.execute(mode['begin'])
+                    connection.execute(
+                        'INSERT INTO message (project_id, author_id, content, time_create) '
+                        "VALUES (?, ?, ?, strftime('%Y-%m-%d %H:%M:%f', 'now'))",
+                        (i % 10, index, 'benchmark message ' * 8),
+                    )
+                    connection.execute('COMMIT')
+                    committed[index] += 1
+                except sqlite3.OperationalError:
+                    if connection.in_transaction:
+                        connection.execute('ROLLBACK')
+                    failed[index] += 1
+            connection.close()
+
+        workers = [threading.Thread(target=writer, args=(index,)) for index in range(threads)]
+        for worker in workers:
+            worker.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for worker in workers:
+            worker.join()
+        return sum(committed), sum(failed), time.perf_counter() - started
@@ -0,0 +1,58 @@
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.views import LoginView, RefreshView, RegisterView
+
+PASSWORD = 'bench-password-1'
+
+
+class Command(BaseCommand):
+    help = 'Time registration, login and token refresh with the configured password hasher and count their queries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=10, help='Requests per endpoint.')
+
+    def handle(self, *args, iterations, **options):
+        host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+        self.factory = RequestFactory(HTTP_HOST=host)
+        hasher = get_hasher()
+        self.stdout.write(f'hasher: {hasher.algorithm} ({getattr(hasher, "iterations", "-")} iterations)')
+        # Users and tokens created here are rolled back.
+        with transaction.atomic():
+            self.report('register', iterations, lambda i: self.post(
+                RegisterView, 'register', username=f'bench-tokens-{i}', password=PASSWORD,
+                first_name='Bench', last_name='Tokens'))
+            self.report('login', iterations, lambda i: self.post(
+                LoginView, 'login', username='bench-tokens-0', password=PASSWORD))
+            refresh = self.post(LoginView, 'login', username='bench-tokens-0', password=PASSWORD)['refresh']
+            # The first refresh caches the token version, as in a running process.
+            self.post(RefreshView, 'token-refresh', refresh=refresh)
+            self.report('refresh', iterations, lambda i: self.post(RefreshView, 'token-refresh', refresh=refresh))
+            transaction.set_rollback(True)
+
+    def post(self, view, name, **data):
+        request = self.factory.post(reverse(name), json.dumps(data), content_type='application/json')
+        response = view.as_view()(request)
+        response.render()
+        if response.status_code >= 400:
+            raise CommandError(f'{name} answered {response.status_code}: {response.data}')
+        return response.data
+
+    def report(self, name, iterations, call):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for i in range(iterations):
+                call(i)
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{name:>8}: {iterations} requests in {elapsed:.2f}s ({iterations / elapsed:.1f} req/s), '
+            f'{len(queries) / iterations:.1f} queries each'
+        )
@@ -0,0 +1,66 @@
+import hashlib
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import Blob, ProjectFile, TaskFile
+from accounts.storage import acquire, digest_of
+
+
+class Command(BaseCommand):
+    help = 'Move project and task files stored before deduplication into the content-addressed layout.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only hash the files and report the space that would be saved.',
+        )
+
+    def handle(self, *args, dry_run=False, **options):
+        moved, missing, before = 0, 0, 0
+        # Bytes of each blob this run adds; content that is already stored as
+        # a blob costs nothing.
+        added, old_names = {}, {}
+        for model in (ProjectFile, TaskFile):
+            storage = model._meta.get_field('file').storage
+            # Read the rows up front: they are updated while we go.
+            rows = list(model.objects.exclude(file='').order_by('pk').values_list('pk', 'file', 'filename'))
+            for pk, name, filename in rows:
+                if digest_of(name) is not None:
+                    continue
+                if not storage.exists(name):
+                    missing += 1
+                    self.stderr.write(f'{model._meta.label} {pk}: {name} is missing.')
+                    continue
+                size = storage.size(name)
+                before += size
+                with storage.open(name, 'rb') as handle:
+                    digest = hashlib.file_digest(handle, 'sha256').hexdigest()
+                    if digest not in added:
+                        referenced = Blob.objects.filter(digest=digest, ref_count__gt=0).exists()
+                        added[digest] = 0 if referenced else size
+                    if not dry_run:
+                        handle.seek(0)
+                        # The blob is pinned only until this commits, so the
+                        # row takes its reference in the same transaction.
+                        with transaction.atomic():
+                            new_name = storage.save(name, handle)
+                            model.objects.filter(pk=pk).update(file=new_name, filename=filename or os.path.basename(name))
+                            acquire(new_name, storage)
+                        old_names[name] = storage
+                moved += 1
+
+        # The same old file may back several rows; remove it once none is left.
+        for name, storage in old_names.items():
+            if not (ProjectFile.objects.filter(file=name).exists() or TaskFile.objects.filter(file=name).exists()):
+                storage.delete(name)
+
+        after = sum(added.values())
+        self.stdout.write(
+            f'{moved} files in {len(added)} blobs, {missing} missing: '
+            f'{before} bytes before, {after} after, {before - after} saved.'
+        )
+        if not dry_run:
+            self.stdout.write(self.style.SUCCESS('Files moved into the deduplicated layout.'))
+
@@ -0,0 +1,25 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Project
+from accounts.transfer import buffered, export_lines
+
+
+class Command(BaseCommand):
+    help = 'Write a project with its statuses, tasks, messages and file metadata as NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_id', type=int)
+        parser.add_argument('--output', '-o', help='File to write to (default: standard output).')
+
+    def handle(self, *args, project_id, output=None, **options):
+        if not Project.objects.filter(pk=project_id).exists():
+            raise CommandError(f'Project {project_id} does not exist.')
+        stream = open(output, 'w', encoding='utf-8') if output else sys.stdout
+        try:
+            for chunk in buffered(export_lines(project_id)):
+                stream.write(chunk)
+        finally:
+            if output:
+                stream.close()
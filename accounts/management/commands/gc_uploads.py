@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from accounts.uploads import collect_garbage
+
+
+class Command(BaseCommand):
+    help = 'Delete resumable upload sessions that have been idle too long, with their stored chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ttl', type=int,
+            help='Idle seconds before a session is collected (default: UPLOAD_SESSION_TTL).',
+        )
+
+    def handle(self, *args, ttl=None, **options):
+        sessions, files = collect_garbage(ttl=timedelta(seconds=ttl) if ttl is not None else None)
+        self.stdout.write(self.style.SUCCESS(f'Deleted {sessions} upload sessions and {files} chunk files.'))
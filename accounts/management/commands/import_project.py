@@ -0,0 +1,27 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.transfer import Importer, label
+
+
+class Command(BaseCommand):
+    help = 'Load an export written by export_project as a new project.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Export file, or - for standard input.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert.')
+
+    def handle(self, *args, path, batch_size, **options):
+        importer = Importer(batch_size=batch_size)
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8')
+        try:
+            project = importer.load(stream)
+        except ValueError as exc:  # ExportFormatError or malformed JSON
+            raise CommandError(f'Import failed: {exc}')
+        finally:
+            if path != '-':
+                stream.close()
+        for model, count in importer.counts.items():
+            self.stdout.write(f'{label(model)}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'Imported project {project.pk} "{project.name}".'))
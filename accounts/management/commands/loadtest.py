@@ -0,0 +1,94 @@
+import asyncio
+import ssl
+import time
+from urllib.parse import urlsplit
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+# The sync endpoints next to their ASGI-native twins (see accounts/async_views.py).
+DEFAULT_PATHS = (
+    '/projects/', '/async/projects/',
+    '/profile/', '/async/profile/',
+)
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+class Command(BaseCommand):
+    help = ('Fire concurrent GETs at a running server (e.g. uvicorn project_management.asgi:application) '
+            'and compare throughput and latency of the sync and async endpoints.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the running server.')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help=f'Path to load, repeatable (default: {" ".join(DEFAULT_PATHS)}).')
+        parser.add_argument('--concurrency', type=int, default=100, help='Requests in flight at once.')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per path.')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Seconds before a request counts as failed.')
+        auth = parser.add_mutually_exclusive_group()
+        auth.add_argument('--token', help='Bearer access token to send.')
+        auth.add_argument('--user', help='Username to mint an access token for.')
+
+    def handle(self, *args, url, paths, concurrency, requests, timeout, token, user, **options):
+        if user is not None:
+            try:
+                token = str(AccessToken.for_user(User.objects.get(username=user)))
+            except User.DoesNotExist:
+                raise CommandError(f'Unknown user "{user}".')
+        base = urlsplit(url)
+        if base.scheme not in ('http', 'https'):
+            raise CommandError('--url must be an http:// or https:// URL.')
+        for path in paths or DEFAULT_PATHS:
+            results, elapsed = asyncio.run(self.run(base, base.path.rstrip('/') + path, token,
+                                                    concurrency, requests, timeout))
+            latencies = sorted(latency for ok, latency in results if ok)
+            failed = len(results) - len(latencies)
+            self.stdout.write(
+                f'{path}: {len(results)} requests in {elapsed:.2f}s ({len(results) / elapsed:.0f} req/s), '
+                f'{failed} failed; latency p50 {percentile(latencies, 0.5) * 1000:.1f}ms '
+                f'p95 {percentile(latencies, 0.95) * 1000:.1f}ms p99 {percentile(latencies, 0.99) * 1000:.1f}ms'
+            )
+
+    async def run(self, base, path, token, concurrency, requests, timeout):
+        remaining = iter(range(requests))
+        results = []
+
+        async def worker():
+            for _ in remaining:
+                started = time.perf_counter()
+                try:
+                    status = await asyncio.wait_for(self.get(base, path, token), timeout)
+                except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+                    status = None
+                results.append((status is not None and status < 400, time.perf_counter() - started))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+        return results, time.perf_counter() - started
+
+    async def get(self, base, path, token):
+        """One GET over a fresh connection with the bare asyncio streams; returns the status code."""
+        secure = base.scheme == 'https'
+        port = base.port or (443 if secure else 80)
+        reader, writer = await asyncio.open_connection(
+            base.hostname, port, ssl=ssl.create_default_context() if secure else None)
+        try:
+            lines = [f'GET {path} HTTP/1.1', f'Host: {base.netloc}', 'Accept: application/json',
+                     'Connection: close']
+            if token:
+                lines.append(f'Authorization: Bearer {token}')
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+            await writer.drain()
+            status_line = await reader.readline()
+            status = int(status_line.split()[1])
+            while await reader.read(65536):
+                pass
+            return status
+        finally:
+            writer.close()
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from accounts.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount project, status and performer counters from scratch and report drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report drift, do not write the recounted values.',
+        )
+
+    def handle(self, *args, check=False, **options):
+        drift = rebuild_counters(apply=not check)
+        for label, stored, actual in drift:
+            self.stdout.write(f'{label}: stored {stored}, actual {actual}')
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('All counters are accurate.'))
+        elif check:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} counters drifted.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Fixed {len(drift)} drifted counters.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from accounts.directory import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the search terms of every profile for the profile directory search.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Profiles indexed per statement.')
+
+    def handle(self, *args, batch_size=1000, **options):
+        count = rebuild(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} profiles.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from accounts.search import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of tasks and messages from scratch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows indexed per statement.')
+
+    def handle(self, *args, batch_size=2000, **options):
+        count = rebuild(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} tasks and messages.'))
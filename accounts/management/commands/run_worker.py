@@ -0,0 +1,36 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from accounts.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs. Several workers can run side by side against one database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queue', action='append', dest='queues',
+            help='Only run jobs of this queue; may be repeated (default: all queues).',
+        )
+        parser.add_argument(
+            '--concurrency', type=int,
+            help='Jobs run at once on the thread pool (default: JOB_CONCURRENCY).',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            help='Seconds to wait when no job is due (default: JOB_POLL_INTERVAL).',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once no job is due instead of waiting for more.',
+        )
+
+    def handle(self, *args, queues=None, concurrency=None, poll_interval=None, burst=False, **options):
+        worker = Worker(queues=queues, concurrency=concurrency, poll_interval=poll_interval)
+        # Finish the running jobs, then exit.
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(f'Worker {worker.id} running up to {worker.concurrency} jobs at a time.')
+        worker.run(burst=burst)
+        self.stdout.write(self.style.SUCCESS('Worker stopped.'))
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from accounts.activity import trim
+
+
+class Command(BaseCommand):
+    help = 'Delete activity events past the retention period or beyond the per-project limit.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            help='Keep events this many days (default: ACTIVITY_RETENTION_DAYS).',
+        )
+        parser.add_argument(
+            '--max-per-project', type=int,
+            help='Keep at most this many events per project (default: ACTIVITY_MAX_EVENTS_PER_PROJECT).',
+        )
+
+    def handle(self, *args, days=None, max_per_project=None, **options):
+        deleted = trim(retention=timedelta(days=days) if days is not None else None, max_per_project=max_per_project)
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} activity events.'))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='contacts',
+            field=models.ManyToManyField(through='accounts.Contact', through_fields=('from_profile', 'to_profile'), to='accounts.profile', verbose_name='Contacts'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['created_at', 'id'], name='accounts_pr_created_038159_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectmessage',
+            index=models.Index(fields=['project', 'time_create', 'id'], name='accounts_pr_project_a3c2a2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['created_at', 'id'], name='accounts_ta_created_094ad6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskmessage',
+            index=models.Index(fields=['task', 'time_create', 'id'], name='accounts_ta_task_id_e7d260_idx'),
+        ),
+    ]
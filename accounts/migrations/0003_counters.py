@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Project = apps.get_model('accounts', 'Project')
+    Status = apps.get_model('accounts', 'Status')
+    Task = apps.get_model('accounts', 'Task')
+    PerformerCounter = apps.get_model('accounts', 'PerformerCounter')
+
+    def count(model_name, field):
+        rows = (apps.get_model('accounts', model_name).objects.filter(**{field: OuterRef('pk')})
+                .order_by().values(field).annotate(count=Count('pk')).values('count'))
+        return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+    Project.objects.update(
+        task_count=count('Task', 'status__project'),
+        message_count=count('ProjectMessage', 'project') + count('TaskMessage', 'task__status__project'),
+        file_count=count('ProjectFile', 'project') + count('TaskFile', 'task__status__project'),
+    )
+    Status.objects.update(task_count=count('Task', 'status'))
+    PerformerCounter.objects.bulk_create([
+        PerformerCounter(project_id=row['status__project'], performer_id=row['performer'], task_count=row['count'])
+        for row in (Task.objects.exclude(performer=None).order_by()
+                    .values('status__project', 'performer').annotate(count=Count('pk')))
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='file_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Files'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='message_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Messages'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='task_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Tasks'),
+        ),
+        migrations.AddField(
+            model_name='status',
+            name='task_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Tasks'),
+        ),
+        migrations.CreateModel(
+            name='PerformerCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_count', models.IntegerField(default=0, verbose_name='Tasks')),
+                ('performer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='performer_counters', to='accounts.profile', verbose_name='Performer')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='performer_counters', to='accounts.project', verbose_name='Project')),
+            ],
+            options={
+                'verbose_name': 'Performer Counter',
+                'verbose_name_plural': 'Performer Counters',
+                'unique_together': {('project', 'performer')},
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:10
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='File Name')),
+                ('description', models.CharField(blank=True, max_length=255, verbose_name='Description')),
+                ('size', models.BigIntegerField(verbose_name='Size')),
+                ('chunk_size', models.IntegerField(verbose_name='Chunk Size')),
+                ('sha256', models.CharField(blank=True, max_length=64, verbose_name='SHA-256')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Updated At')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='accounts.profile', verbose_name='Owner')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='accounts.project', verbose_name='Project')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='accounts.task', verbose_name='Task')),
+            ],
+            options={
+                'verbose_name': 'Upload Session',
+                'verbose_name_plural': 'Upload Sessions',
+            },
+        ),
+        migrations.CreateModel(
+            name='UploadChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.IntegerField(verbose_name='Index')),
+                ('size', models.IntegerField(verbose_name='Size')),
+                ('sha256', models.CharField(max_length=64, verbose_name='SHA-256')),
+                ('name', models.CharField(max_length=255, verbose_name='Storage Name')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='accounts.uploadsession', verbose_name='Session')),
+            ],
+            options={
+                'verbose_name': 'Upload Chunk',
+                'verbose_name_plural': 'Upload Chunks',
+                'unique_together': {('session', 'index')},
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:13
+
+import os
+
+import accounts.storage
+from django.db import migrations, models
+
+
+def backfill_filenames(apps, schema_editor):
+    for model_name in ('ProjectFile', 'TaskFile'):
+        model = apps.get_model('accounts', model_name)
+        rows = list(model.objects.filter(filename='').only('pk', 'file'))
+        for row in rows:
+            row.filename = os.path.basename(row.file.name)[:255]
+        model.objects.bulk_update(rows, ['filename'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='SHA-256')),
+                ('size', models.BigIntegerField(verbose_name='Size')),
+                ('ref_count', models.IntegerField(default=0, verbose_name='References')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+            ],
+            options={
+                'verbose_name': 'Blob',
+                'verbose_name_plural': 'Blobs',
+            },
+        ),
+        migrations.AddField(
+            model_name='projectfile',
+            name='filename',
+            field=models.CharField(blank=True, max_length=255, verbose_name='File Name'),
+        ),
+        migrations.AddField(
+            model_name='taskfile',
+            name='filename',
+            field=models.CharField(blank=True, max_length=255, verbose_name='File Name'),
+        ),
+        migrations.AlterField(
+            model_name='projectfile',
+            name='file',
+            field=models.FileField(storage=accounts.storage.file_storage, upload_to='project_files/', verbose_name='File'),
+        ),
+        migrations.AlterField(
+            model_name='taskfile',
+            name='file',
+            field=models.FileField(storage=accounts.storage.file_storage, upload_to='task_files/', verbose_name='File'),
+        ),
+        migrations.RunPython(backfill_filenames, migrations.RunPython.noop),
+    ]
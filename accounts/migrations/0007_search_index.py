@@ -0,0 +1,54 @@
+from django.db import migrations
+
+# Row ids are pk * 3 + kind (0 task, 1 project message, 2 task message), as
+# in accounts/search.py.
+CREATE = """
+CREATE VIRTUAL TABLE accounts_search USING fts5(
+    body, scope, kind UNINDEXED, object_id UNINDEXED, project_id UNINDEXED, task_id UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+)
+"""
+
+FILL = (
+    """
+    INSERT INTO accounts_search (rowid, body, scope, kind, object_id, project_id, task_id)
+    SELECT t.id * 3, t.name || char(10) || t.description, 'p' || s.project_id, 0, t.id, s.project_id, t.id
+    FROM accounts_task t JOIN accounts_status s ON s.id = t.status_id
+    """,
+    """
+    INSERT INTO accounts_search (rowid, body, scope, kind, object_id, project_id, task_id)
+    SELECT m.id * 3 + 1, m.content, 'p' || m.project_id, 1, m.id, m.project_id, NULL
+    FROM accounts_projectmessage m
+    """,
+    """
+    INSERT INTO accounts_search (rowid, body, scope, kind, object_id, project_id, task_id)
+    SELECT m.id * 3 + 2, m.content, 'p' || s.project_id, 2, m.id, s.project_id, m.task_id
+    FROM accounts_taskmessage m JOIN accounts_task t ON t.id = m.task_id JOIN accounts_status s ON s.id = t.status_id
+    """,
+)
+
+
+def create_index(apps, schema_editor):
+    # Other databases use the index-free accounts.search.DatabaseSearchBackend
+    # unless SEARCH_BACKEND names one with its own storage.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE)
+    for statement in FILL:
+        schema_editor.execute(statement)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS accounts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_jobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
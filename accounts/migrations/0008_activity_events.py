@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verb', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated')], max_length=16, verbose_name='Verb')),
+                ('target_type', models.CharField(max_length=32, verbose_name='Target Type')),
+                ('target_id', models.BigIntegerField(verbose_name='Target ID')),
+                ('data', models.JSONField(blank=True, default=dict, verbose_name='Data')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='activity', to='accounts.profile', verbose_name='Actor')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='accounts.project', verbose_name='Project')),
+            ],
+            options={
+                'verbose_name': 'Activity Event',
+                'verbose_name_plural': 'Activity Events',
+                'indexes': [models.Index(fields=['project', 'created_at', 'id'], name='accounts_ac_project_f2cca5_idx'), models.Index(fields=['target_type', 'target_id'], name='accounts_ac_target__7d71ef_idx'), models.Index(fields=['created_at'], name='accounts_ac_created_114745_idx')],
+            },
+        ),
+    ]
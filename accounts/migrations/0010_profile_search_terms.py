@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:38
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# A frozen copy of accounts.directory.terms_for at the time of this
+# migration, so later changes to the live code do not alter it.
+TERM = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+
+
+def terms_for(*names):
+    terms = set()
+    for name in names:
+        decomposed = unicodedata.normalize('NFKD', name or '')
+        stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+        terms.update(word[:MAX_TERM_LENGTH] for word in TERM.findall(stripped.casefold()))
+    return terms
+
+
+def index_profiles(apps, schema_editor):
+    Profile = apps.get_model('accounts', 'Profile')
+    ProfileSearchTerm = apps.get_model('accounts', 'ProfileSearchTerm')
+    rows = Profile.objects.values_list('pk', 'user__username', 'first_name', 'last_name').iterator(chunk_size=2000)
+    batch = []
+    for pk, *names in rows:
+        batch.extend(ProfileSearchTerm(profile_id=pk, term=term) for term in terms_for(*names))
+        if len(batch) >= 2000:
+            ProfileSearchTerm.objects.bulk_create(batch)
+            batch = []
+    ProfileSearchTerm.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_profile_token_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Term')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='accounts.profile', verbose_name='Profile')),
+            ],
+            options={
+                'verbose_name': 'Profile Search Term',
+                'verbose_name_plural': 'Profile Search Terms',
+                'indexes': [models.Index(fields=['term', 'profile'], name='accounts_pr_term_c061df_idx')],
+                'unique_together': {('profile', 'term')},
+            },
+        ),
+        migrations.RunPython(index_profiles, migrations.RunPython.noop),
+    ]
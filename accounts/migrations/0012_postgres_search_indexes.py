@@ -0,0 +1,38 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+# The vectors accounts.search.PostgresSearchBackend matches, frozen here: a
+# query only uses an index built on the identical expression.
+INDEXES = (
+    ('Task', GinIndex(SearchVector('name', 'description', config='simple'), name='accounts_task_search')),
+    ('ProjectMessage', GinIndex(SearchVector('content', config='simple'), name='accounts_projmsg_search')),
+    ('TaskMessage', GinIndex(SearchVector('content', config='simple'), name='accounts_taskmsg_search')),
+)
+
+
+def create_indexes(apps, schema_editor):
+    # SQLite has the FTS5 table of migration 0007; other databases use the
+    # unindexed accounts.search.DatabaseSearchBackend.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in INDEXES:
+        schema_editor.add_index(apps.get_model('accounts', model_name), index)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in INDEXES:
+        schema_editor.remove_index(apps.get_model('accounts', model_name), index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_task_status_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,32 @@
+class EagerLoadingMixin:
+    """
+    Serializer mixin that declares which relations its representation walks.
+
+    The plan is spelled out in full from the serializer's own model, including
+    the relations its nested serializers walk (``author__user`` for a nested
+    profile), so a list view loads everything it renders in bulk.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        return queryset
+
+
+class EagerLoadingViewMixin:
+    """
+    Generic view mixin applying the serializer's eager-loading plan to every
+    queryset the view lists or retrieves from.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if issubclass(serializer_class, EagerLoadingMixin):
+            queryset = serializer_class.setup_eager_loading(queryset)
+        return queryset
@@ -1,12 +1,24 @@
+import os
+import uuid
+
 from django.core.validators import MinLengthValidator
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 
+from .storage import file_storage
+
 
 def avatar_upload_path(instance, filename):
     return f'avatars/{instance.user.username}/{filename}'
 
 
+def remember_filename(instance):
+    # Stored names are content digests, so keep the uploaded name for display
+    # and downloads.
+    if not instance.filename and instance.file and not instance.file._committed:
+        instance.filename = os.path.basename(instance.file.name)
+
+
 class Contact(models.Model):
     from_profile = models.ForeignKey(
         'Profile',
@@ -51,6 +63,10 @@ class Profile(models.Model):
         through_fields=('from_profile', 'to_profile'),
         verbose_name='Contacts',
     )
+    token_version = models.IntegerField(
+        default=0,
+        verbose_name='Token Version',
+    )
 
     class Meta:
         verbose_name = 'Profile'
@@ -59,6 +75,16 @@ class Profile(models.Model):
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        if fields is not None and self.__dict__.pop('_load_whole_row', False):
+            # A profile built from token claims (see ClaimsUser in
+            # accounts/authentication.py): the first deferred field read
+            # loads the whole row, and the user unless it is loaded already.
+            fields = [field.name for field in self._meta.concrete_fields]
+            if not self._meta.get_field('user').is_cached(self):
+                from_queryset = (from_queryset or self.__class__._base_manager).select_related('user')
+        super().refresh_from_db(using, fields, from_queryset)
+
 
 class Project(models.Model):
     owner = models.ForeignKey(
@@ -100,11 +126,27 @@ class Project(models.Model):
         auto_now=True,
         verbose_name='Updated At',
     )
+    task_count = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Tasks',
+    )
+    message_count = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Messages',
+    )
+    file_count = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Files',
+    )
 
     class Meta:
         verbose_name = 'Project'
         verbose_name_plural = 'Projects'
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['created_at', 'id'])]
 
     def __str__(self):
         return self.name
@@ -119,8 +161,14 @@ class ProjectFile(models.Model):
     )
     file = models.FileField(
         upload_to='project_files/',
+        storage=file_storage,
         verbose_name='File',
     )
+    filename = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='File Name',
+    )
     description = models.CharField(
         max_length=255,
         blank=True,
@@ -138,6 +186,13 @@ class ProjectFile(models.Model):
     def __str__(self):
         return f"File for {self.project.name}"
 
+    def save(self, *args, **kwargs):
+        remember_filename(self)
+        # Storing the file pins its blob until commit; the row's reference is
+        # taken in the same transaction.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
 
 class Status(models.Model):
     project = models.ForeignKey(
@@ -151,6 +206,11 @@ class Status(models.Model):
         validators=[MinLengthValidator(3)],
         verbose_name='Status Name',
     )
+    task_count = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Tasks',
+    )
 
     class Meta:
         verbose_name = 'Status'
@@ -207,11 +267,42 @@ class Task(models.Model):
     class Meta:
         verbose_name = 'Task'
         verbose_name_plural = 'Tasks'
+        # Tasks are paged per project through their statuses: each status
+        # is a range of this index from the cursor on, and only that
+        # project's rows are sorted, not a scan of every project's tasks.
+        indexes = [models.Index(fields=['status', 'created_at', 'id'])]
 
     def __str__(self):
         return self.name
 
 
+class PerformerCounter(models.Model):
+    project = models.ForeignKey(
+        Project,
+        related_name='performer_counters',
+        on_delete=models.CASCADE,
+        verbose_name='Project',
+    )
+    performer = models.ForeignKey(
+        Profile,
+        related_name='performer_counters',
+        on_delete=models.CASCADE,
+        verbose_name='Performer',
+    )
+    task_count = models.IntegerField(
+        default=0,
+        verbose_name='Tasks',
+    )
+
+    class Meta:
+        unique_together = ['project', 'performer']
+        verbose_name = 'Performer Counter'
+        verbose_name_plural = 'Performer Counters'
+
+    def __str__(self):
+        return f"{self.performer} in {self.project.name}: {self.task_count}"
+
+
 class TaskFile(models.Model):
     task = models.ForeignKey(
         Task,
@@ -221,8 +312,14 @@ class TaskFile(models.Model):
     )
     file = models.FileField(
         upload_to='task_files/',
+        storage=file_storage,
         verbose_name='File',
     )
+    filename = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='File Name',
+    )
     description = models.CharField(
         max_length=255,
         blank=True,
@@ -240,6 +337,13 @@ class TaskFile(models.Model):
     def __str__(self):
         return f"File for {self.task.name}"
 
+    def save(self, *args, **kwargs):
+        remember_filename(self)
+        # Storing the file pins its blob until commit; the row's reference is
+        # taken in the same transaction.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
 
 class ProjectMessage(models.Model):
     author = models.ForeignKey(
@@ -285,6 +389,7 @@ class ProjectMessage(models.Model):
         ordering = ['time_create']
         verbose_name = 'Project Message'
         verbose_name_plural = 'Project Messages'
+        indexes = [models.Index(fields=['project', 'time_create', 'id'])]
 
     def __str__(self):
         return f"Message by {self.author} in {self.project.name}"
@@ -334,6 +439,296 @@ class TaskMessage(models.Model):
         ordering = ['time_create']
         verbose_name = 'Task Message'
         verbose_name_plural = 'Task Messages'
+        indexes = [models.Index(fields=['task', 'time_create', 'id'])]
+
+    def __str__(self):
+        return f"Message by {self.author} in {self.task.name}"
+
+class UploadSession(models.Model):
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+    )
+    owner = models.ForeignKey(
+        Profile,
+        related_name='upload_sessions',
+        on_delete=models.CASCADE,
+        verbose_name='Owner',
+    )
+    project = models.ForeignKey(
+        Project,
+        related_name='upload_sessions',
+        on_delete=models.CASCADE,
+        verbose_name='Project',
+    )
+    task = models.ForeignKey(
+        Task,
+        related_name='upload_sessions',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name='Task',
+    )
+    filename = models.CharField(
+        max_length=255,
+        verbose_name='File Name',
+    )
+    description = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Description',
+    )
+    size = models.BigIntegerField(
+        verbose_name='Size',
+    )
+    chunk_size = models.IntegerField(
+        verbose_name='Chunk Size',
+    )
+    sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name='SHA-256',
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Created At',
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Updated At',
+    )
+
+    class Meta:
+        verbose_name = 'Upload Session'
+        verbose_name_plural = 'Upload Sessions'
+
+    def __str__(self):
+        return f"Upload of {self.filename}"
+
+
+class UploadChunk(models.Model):
+    session = models.ForeignKey(
+        UploadSession,
+        related_name='chunks',
+        on_delete=models.CASCADE,
+        verbose_name='Session',
+    )
+    index = models.IntegerField(
+        verbose_name='Index',
+    )
+    size = models.IntegerField(
+        verbose_name='Size',
+    )
+    sha256 = models.CharField(
+        max_length=64,
+        verbose_name='SHA-256',
+    )
+    name = models.CharField(
+        max_length=255,
+        verbose_name='Storage Name',
+    )
+
+    class Meta:
+        unique_together = ['session', 'index']
+        verbose_name = 'Upload Chunk'
+        verbose_name_plural = 'Upload Chunks'
+
+    def __str__(self):
+        return f"Chunk {self.index} of {self.session}"
+
+
+class Blob(models.Model):
+    digest = models.CharField(
+        max_length=64,
+        primary_key=True,
+        verbose_name='SHA-256',
+    )
+    size = models.BigIntegerField(
+        verbose_name='Size',
+    )
+    ref_count = models.IntegerField(
+        default=0,
+        verbose_name='References',
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Created At',
+    )
+
+    class Meta:
+        verbose_name = 'Blob'
+        verbose_name_plural = 'Blobs'
+
+    def __str__(self):
+        return self.digest
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(
+        max_length=255,
+        verbose_name='Task',
+    )
+    queue = models.CharField(
+        max_length=64,
+        default='default',
+        verbose_name='Queue',
+    )
+    args = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name='Arguments',
+    )
+    kwargs = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Keyword Arguments',
+    )
+    idempotency_key = models.CharField(
+        max_length=255,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name='Idempotency Key',
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=QUEUED,
+        verbose_name='Status',
+    )
+    attempts = models.IntegerField(
+        default=0,
+        verbose_name='Attempts',
+    )
+    max_attempts = models.IntegerField(
+        default=5,
+        verbose_name='Max Attempts',
+    )
+    run_at = models.DateTimeField(
+        verbose_name='Run At',
+    )
+    locked_by = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Locked By',
+    )
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Locked Until',
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Last Error',
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Created At',
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Finished At',
+    )
+
+    class Meta:
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        indexes = [models.Index(fields=['status', 'queue', 'run_at'])]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class ActivityEvent(models.Model):
+    CREATED = 'created'
+    UPDATED = 'updated'
+    VERB_CHOICES = [
+        (CREATED, 'Created'),
+        (UPDATED, 'Updated'),
+    ]
+
+    project = models.ForeignKey(
+        Project,
+        related_name='activity',
+        on_delete=models.CASCADE,
+        verbose_name='Project',
+    )
+    actor = models.ForeignKey(
+        Profile,
+        related_name='activity',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name='Actor',
+    )
+    verb = models.CharField(
+        max_length=16,
+        choices=VERB_CHOICES,
+        verbose_name='Verb',
+    )
+    target_type = models.CharField(
+        max_length=32,
+        verbose_name='Target Type',
+    )
+    target_id = models.BigIntegerField(
+        verbose_name='Target ID',
+    )
+    data = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Data',
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Created At',
+    )
+
+    class Meta:
+        verbose_name = 'Activity Event'
+        verbose_name_plural = 'Activity Events'
+        indexes = [
+            models.Index(fields=['project', 'created_at', 'id']),
+            models.Index(fields=['target_type', 'target_id']),
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.target_type} {self.target_id} {self.verb}"
+
+
+class ProfileSearchTerm(models.Model):
+    # One row per normalized word of a profile's username and names, kept by
+    # accounts.directory; prefix searches are range scans over ``term``.
+    profile = models.ForeignKey(
+        Profile,
+        related_name='search_terms',
+        on_delete=models.CASCADE,
+        verbose_name='Profile',
+    )
+    term = models.CharField(
+        max_length=64,
+        verbose_name='Term',
+    )
+
+    class Meta:
+        verbose_name = 'Profile Search Term'
+        verbose_name_plural = 'Profile Search Terms'
+        unique_together = ('profile', 'term')
+        indexes = [models.Index(fields=['term', 'profile'])]
 
     def __str__(self):
-        return f"Message by {self.author} in {self.task.name}"
\ No newline at end of file
+        return self.term
@@ -0,0 +1,231 @@
+from base64 import b64decode, b64encode
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination ordered on ``(timestamp, id)``.
+
+    Besides the usual ``cursor`` links, every page carries a ``since`` token
+    pointing at its newest row. Passing it back as ``?since=`` returns only the
+    rows created after that point, so clients can poll for new items instead
+    of refetching the whole list.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    since_query_param = 'since'
+    invalid_since_message = 'Invalid since cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        token = request.query_params.get(self.since_query_param)
+        if token:
+            queryset = queryset.filter(self.after(*self.decode_since(token)))
+        page = super().paginate_queryset(queryset, request, view)
+        if page:
+            self.since = self.encode_since(page[0] if self.ordering[0].startswith('-') else page[-1])
+        else:
+            self.since = token
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'since': self.since,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties']['since'] = {'type': 'string', 'nullable': True}
+        return schema
+
+    def after(self, timestamp, pk):
+        field = self.ordering[0].lstrip('-')
+        return Q(**{f'{field}__gt': timestamp}) | Q(**{field: timestamp, 'pk__gt': pk})
+
+    def encode_since(self, instance):
+        timestamp = getattr(instance, self.ordering[0].lstrip('-'))
+        return b64encode(f'{timestamp.isoformat()}|{instance.pk}'.encode()).decode('ascii')
+
+    def decode_since(self, token):
+        try:
+            timestamp, pk = b64decode(token.encode('ascii')).decode('ascii').split('|')
+            return datetime.fromisoformat(timestamp), int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_since_message)
+
+
+class MessageCursorPagination(KeysetCursorPagination):
+    ordering = ('time_create', 'id')
+
+
+class TaskCursorPagination(KeysetCursorPagination):
+    ordering = ('created_at', 'id')
+
+
+class ActivityCursorPagination(KeysetCursorPagination):
+    """Newest events first; the ``since`` token of the first page then picks up what happens next."""
+    ordering = ('-created_at', '-id')
+
+
+class ProjectCursorPagination(CursorPagination):
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class ProfileCursorPagination(CursorPagination):
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class KeysetPagination:
+    """
+    Keyset pages on an arbitrary ordering: ``?since=`` takes the ``next``
+    token of the previous page and continues right after the row it points
+    at, like the ``since`` of ``KeysetCursorPagination``.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    since_query_param = 'since'
+    invalid_cursor_message = 'Invalid since cursor'
+
+    def __init__(self, *ordering):
+        self.ordering = ordering
+        self.descending = ordering[0].startswith('-')
+        self.fields = [field.lstrip('-') for field in ordering]
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.GET[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_after(self, request):
+        token = request.GET.get(self.since_query_param)
+        if not token:
+            return None
+        try:
+            values = b64decode(token.encode('ascii'), validate=True).decode('ascii').split('|')
+        except (ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if len(values) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def after(self, values):
+        lookup = 'lt' if self.descending else 'gt'
+        condition = Q()
+        for index, field in enumerate(self.fields):
+            equal = {previous: values[position] for position, previous in enumerate(self.fields[:index])}
+            condition |= Q(**equal, **{f'{field}__{lookup}': values[index]})
+        return condition
+
+    def encode(self, instance):
+        values = []
+        for field in self.fields:
+            value = getattr(instance, field)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        return b64encode('|'.join(values).encode()).decode('ascii')
+
+    def page(self, queryset, request):
+        """The sliced queryset of the requested page and its size."""
+        size = self.get_page_size(request)
+        after = self.get_after(request)
+        if after is not None:
+            try:
+                queryset = queryset.filter(self.after(after))
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+        return queryset.order_by(*self.ordering)[:size], size
+
+
+class AsyncKeysetPagination(KeysetPagination):
+    """
+    Keyset pages for the async views, fetched with the async ORM. On
+    ascending lists the token of the last row doubles as a ``since`` marker
+    for polling.
+    """
+
+    async def paginate_queryset(self, queryset, request):
+        """Return ``(rows, next_token)``; ``next_token`` is None on the last page."""
+        page, size = self.page(queryset, request)
+        rows = [row async for row in page]
+        return rows, (self.encode(rows[-1]) if len(rows) == size else None)
+
+
+class ProfileSearchPagination(KeysetPagination):
+    """Pages of ``accounts.directory.matches`` rows, in term order."""
+    page_size = 20
+    max_page_size = 50
+
+    def __init__(self):
+        super().__init__('term', 'profile_id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page, size = self.page(queryset, request)
+        rows = list(page)
+        self.next = self.encode(rows[-1]) if len(rows) == size else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.next, 'results': data})
+
+
+class SearchPagination(BasePagination):
+    """
+    Offset pages over ranked search hits. One hit more than the page is
+    fetched to know whether a next page exists, so matches are never counted.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    offset_query_param = 'offset'
+    max_offset = 1000
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_offset(self, request):
+        try:
+            offset = int(request.query_params.get(self.offset_query_param, 0))
+        except ValueError:
+            raise NotFound('Invalid offset')
+        if not 0 <= offset <= self.max_offset:
+            raise NotFound('Invalid offset')
+        return offset
+
+    def paginate_hits(self, search, request):
+        """``search(limit, offset)`` returns ranked hits; returns the current page of them."""
+        self.request = request
+        size, offset = self.get_page_size(request), self.get_offset(request)
+        hits = search(size + 1, offset)
+        self.next_offset = offset + size if len(hits) > size and offset + size <= self.max_offset else None
+        return hits[:size]
+
+    def get_next_link(self):
+        if self.next_offset is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.offset_query_param, self.next_offset)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
@@ -0,0 +1,30 @@
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+
+from .access import NO_PROJECT, OWNER, project_role
+
+
+class IsProjectMember(BasePermission):
+    """Access to views under ``projects/<project_id>/`` for the owner and members."""
+    message = 'You are not a member of this project.'
+
+    def has_permission(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return False
+        role = project_role(request, view.kwargs['project_id'])
+        if role == NO_PROJECT:
+            raise NotFound('Project not found.')
+        return self.allows(role, request)
+
+    def allows(self, role, request):
+        return bool(role)
+
+
+class IsProjectOwnerOrMemberReadOnly(IsProjectMember):
+    """Members may read, only the owner may change."""
+    message = 'Only the project owner can do this.'
+
+    def allows(self, role, request):
+        if request.method in SAFE_METHODS:
+            return bool(role)
+        return role == OWNER
@@ -0,0 +1,326 @@
+import abc
+import html
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db import connections, router
+from django.db.models import Q, Value
+from django.db.models.functions import Concat
+from django.utils.module_loading import import_string
+
+from .models import ProjectMessage, Task, TaskMessage
+
+INDEX_TABLE = 'accounts_search'
+MAX_TERMS = 16
+
+# Kinds of indexed rows; the code also spreads ids over the index rowids.
+KINDS = ('task', 'project_message', 'task_message')
+MODELS = {'task': Task, 'project_message': ProjectMessage, 'task_message': TaskMessage}
+KIND_OF = {model: kind for kind, model in MODELS.items()}
+
+Document = namedtuple('Document', 'kind id project_id task_id body')
+
+TERM = re.compile(r'\w+')
+# Private use characters mark matches inside snippets until they are escaped.
+MARK_START, MARK_END = '\ue000', '\ue001'
+
+
+def documents(kind, queryset, chunk_size=2000):
+    """Yield the documents of the ``kind`` rows in ``queryset``."""
+    if kind == 'task':
+        rows = queryset.values_list('pk', 'status__project_id', 'pk', 'name', 'description')
+        for pk, project_id, task_id, name, description in rows.iterator(chunk_size):
+            yield Document(kind, pk, project_id, task_id, f'{name}\n{description}')
+    elif kind == 'project_message':
+        rows = queryset.values_list('pk', 'project_id', 'content')
+        for pk, project_id, content in rows.iterator(chunk_size):
+            yield Document(kind, pk, project_id, None, content)
+    else:
+        rows = queryset.values_list('pk', 'task__status__project_id', 'task_id', 'content')
+        for pk, project_id, task_id, content in rows.iterator(chunk_size):
+            yield Document(kind, pk, project_id, task_id, content)
+
+
+def terms(query):
+    return TERM.findall(query)[:MAX_TERMS]
+
+
+def highlight(snippet):
+    """HTML-escape ``snippet`` and wrap its matches in ``<mark>``."""
+    return html.escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+class SearchBackend(abc.ABC):
+    """
+    Keeps a searchable copy of task and message text. ``index`` and
+    ``remove`` run inside the transaction of the write they mirror.
+    """
+
+    @abc.abstractmethod
+    def index(self, documents):
+        """Add or replace ``documents``."""
+
+    @abc.abstractmethod
+    def remove(self, kind, ids):
+        """Drop the ``kind`` rows with ``ids``."""
+
+    @abc.abstractmethod
+    def clear(self):
+        """Drop every row."""
+
+    @abc.abstractmethod
+    def optimize(self):
+        """Compact the index after a rebuild."""
+
+    @abc.abstractmethod
+    def search(self, query, project_ids, limit, offset=0):
+        """
+        Hits for ``query`` in ``project_ids``, best first: dicts with
+        ``type``, ``id``, ``project``, ``task``, ``snippet`` and ``score``.
+        """
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """
+    SQLite FTS5 index (created by migration 0007).
+
+    The project of every row is also indexed as a ``p<id>`` token, so the
+    membership restriction is part of the ``MATCH`` and intersects posting
+    lists instead of filtering matches one by one. Rows are ranked with
+    BM25 over the text column.
+    """
+
+    def connection(self, write=False):
+        alias = router.db_for_write(Task) if write else router.db_for_read(Task)
+        return connections[alias]
+
+    def rowid(self, kind, pk):
+        return pk * len(KINDS) + KINDS.index(kind)
+
+    def index(self, documents):
+        rows = [(self.rowid(d.kind, d.id), d.body, f'p{d.project_id}', KINDS.index(d.kind), d.id,
+                 d.project_id, d.task_id) for d in documents if d.project_id is not None]
+        if not rows:
+            return
+        with self.connection(write=True).cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {INDEX_TABLE} (rowid, body, scope, kind, object_id, project_id, task_id) '
+                'VALUES (%s, %s, %s, %s, %s, %s, %s)', rows)
+
+    def remove(self, kind, ids):
+        rowids = [self.rowid(kind, pk) for pk in ids]
+        if not rowids:
+            return
+        with self.connection(write=True).cursor() as cursor:
+            cursor.execute(f'DELETE FROM {INDEX_TABLE} WHERE rowid IN ({", ".join(["%s"] * len(rowids))})', rowids)
+
+    def clear(self):
+        with self.connection(write=True).cursor() as cursor:
+            cursor.execute(f'DELETE FROM {INDEX_TABLE}')
+
+    def optimize(self):
+        with self.connection(write=True).cursor() as cursor:
+            cursor.execute(f"INSERT INTO {INDEX_TABLE} ({INDEX_TABLE}) VALUES ('optimize')")
+
+    def match(self, query, project_ids):
+        words = terms(query)
+        if not words or not project_ids:
+            return None
+        # Every term is quoted, so the query syntax cannot be injected; the
+        # last one matches as a prefix for search-as-you-type.
+        phrases = ' '.join(f'"{word}"' for word in words) + '*'
+        scope = ' OR '.join(f'p{int(pk)}' for pk in project_ids)
+        return f'body : ({phrases}) AND scope : ({scope})'
+
+    def search(self, query, project_ids, limit, offset=0):
+        expression = self.match(query, project_ids)
+        if expression is None:
+            return []
+        with self.connection().cursor() as cursor:
+            cursor.execute(
+                f'SELECT kind, object_id, project_id, task_id, snippet({INDEX_TABLE}, 0, %s, %s, %s, 16), '
+                f'bm25({INDEX_TABLE}, 1.0, 0.0) AS score '
+                f'FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH %s ORDER BY score LIMIT %s OFFSET %s',
+                [MARK_START, MARK_END, '…', expression, limit, offset])
+            rows = cursor.fetchall()
+        return [{'type': KINDS[kind], 'id': pk, 'project': project_id, 'task': task_id,
+                 'snippet': highlight(snippet), 'score': -score}
+                for kind, pk, project_id, task_id, snippet, score in rows]
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    PostgreSQL full-text search over the rows themselves.
+
+    Migration 0012 puts a GIN index on the ``SearchVector`` of each source,
+    which PostgreSQL keeps up to date with the rows, so there is no separate
+    index to write. Queries match the same vectors, so the planner uses those
+    indexes. Hits are ranked with ``SearchRank``, and the last term matches
+    as a prefix, as it does on SQLite.
+    """
+    # Text search configuration the indexes of migration 0012 are built with.
+    config = 'simple'
+    snippet_words = 16
+
+    def index(self, documents):
+        pass
+
+    def remove(self, kind, ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def optimize(self):
+        pass
+
+    def tsquery(self, words):
+        # Terms are word characters only, so quoting them is enough to keep
+        # the tsquery syntax out.
+        return ' & '.join(f"'{word.lower()}'" for word in words) + ':*'
+
+    def sources(self, project_ids):
+        return (
+            ('task', Task.objects.filter(status__project_id__in=project_ids), ('name', 'description'),
+             'status__project_id', 'pk'),
+            ('project_message', ProjectMessage.objects.filter(project_id__in=project_ids), ('content',),
+             'project_id', None),
+            ('task_message', TaskMessage.objects.filter(task__status__project_id__in=project_ids), ('content',),
+             'task__status__project_id', 'task_id'),
+        )
+
+    def search(self, query, project_ids, limit, offset=0):
+        words = terms(query)
+        if not words or not project_ids:
+            return []
+        tsquery = SearchQuery(self.tsquery(words), config=self.config, search_type='raw')
+        hits = []
+        for kind, queryset, fields, project, task in self.sources(project_ids):
+            vector = SearchVector(*fields, config=self.config)
+            text = Concat(fields[0], Value('\n'), fields[1]) if len(fields) > 1 else fields[0]
+            rows = queryset.annotate(
+                document=vector,
+                score=SearchRank(vector, tsquery),
+                snippet=SearchHeadline(text, tsquery, config=self.config, start_sel=MARK_START,
+                                       stop_sel=MARK_END, max_words=self.snippet_words,
+                                       min_words=self.snippet_words // 2),
+            ).filter(document=tsquery).order_by('-score', '-pk')
+            columns = ['pk', project, 'snippet', 'score'] + ([task] if task else [])
+            for row in rows.values_list(*columns)[:offset + limit]:
+                hits.append({'type': kind, 'id': row[0], 'project': row[1], 'task': row[4] if task else None,
+                             'snippet': highlight(row[2]), 'score': row[3]})
+        hits.sort(key=lambda hit: (hit['score'], hit['id']), reverse=True)
+        return hits[offset:offset + limit]
+
+
+class DatabaseSearchBackend(SearchBackend):
+    """
+    Fallback for databases without a search backend: every term must appear
+    (case-insensitively) and the newest rows come first.
+
+    Nothing is indexed: each search scans the tasks and messages of the
+    projects with ``icontains``, so it slows down as they grow.
+    """
+    snippet_length = 200
+
+    # The rows themselves are searched, so there is nothing to maintain.
+    def index(self, documents):
+        pass
+
+    def remove(self, kind, ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def optimize(self):
+        pass
+
+    def search(self, query, project_ids, limit, offset=0):
+        words = terms(query)
+        if not words or not project_ids:
+            return []
+        sources = (
+            ('task', Task.objects.filter(status__project_id__in=project_ids), ('name', 'description'),
+             'created_at', 'status__project_id', 'pk'),
+            ('project_message', ProjectMessage.objects.filter(project_id__in=project_ids), ('content',),
+             'time_create', 'project_id', None),
+            ('task_message', TaskMessage.objects.filter(task__status__project_id__in=project_ids), ('content',),
+             'time_create', 'task__status__project_id', 'task_id'),
+        )
+        hits = []
+        for kind, queryset, fields, timestamp, project, task in sources:
+            for word in words:
+                condition = Q()
+                for field in fields:
+                    condition |= Q(**{f'{field}__icontains': word})
+                queryset = queryset.filter(condition)
+            columns = ['pk', project, timestamp, *fields] + ([task] if task else [])
+            for row in queryset.order_by(f'-{timestamp}', '-pk').values_list(*columns)[:offset + limit]:
+                text = '\n'.join(row[3:3 + len(fields)])
+                hits.append((row[2], {'type': kind, 'id': row[0], 'project': row[1],
+                                      'task': row[-1] if task else None,
+                                      'snippet': html.escape(text[:self.snippet_length]), 'score': None}))
+        hits.sort(key=lambda hit: (hit[0], hit[1]['id']), reverse=True)
+        return [hit for _, hit in hits[offset:offset + limit]]
+
+
+VENDOR_BACKENDS = {
+    'sqlite': 'accounts.search.SQLiteSearchBackend',
+    'postgresql': 'accounts.search.PostgresSearchBackend',
+}
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    path = getattr(settings, 'SEARCH_BACKEND', None)
+    if path is None:
+        vendor = connections[router.db_for_write(Task)].vendor
+        path = VENDOR_BACKENDS.get(vendor, 'accounts.search.DatabaseSearchBackend')
+    return import_string(path)()
+
+
+def search(query, project_ids, limit, offset=0):
+    return get_backend().search(query, list(project_ids), limit, offset)
+
+
+def index_rows(kind, ids):
+    get_backend().index(documents(kind, MODELS[kind].objects.filter(pk__in=ids)))
+
+
+def index_task_messages(task_id):
+    get_backend().index(documents('task_message', TaskMessage.objects.filter(task_id=task_id)))
+
+
+def remove_rows(kind, ids):
+    get_backend().remove(kind, ids)
+
+
+def reindex_project(project_id):
+    """Index every task and message of a project, e.g. after rows were written with ``bulk_create``."""
+    backend = get_backend()
+    backend.index(documents('task', Task.objects.filter(status__project_id=project_id)))
+    backend.index(documents('project_message', ProjectMessage.objects.filter(project_id=project_id)))
+    backend.index(documents('task_message', TaskMessage.objects.filter(task__status__project_id=project_id)))
+
+
+def rebuild(batch_size=2000):
+    """Empty the index and fill it from every task and message; returns how many rows were indexed."""
+    backend = get_backend()
+    backend.clear()
+    count = 0
+    for kind, model in MODELS.items():
+        batch = []
+        for document in documents(kind, model.objects.order_by('pk'), batch_size):
+            batch.append(document)
+            if len(batch) >= batch_size:
+                backend.index(batch)
+                count += len(batch)
+                batch = []
+        backend.index(batch)
+        count += len(batch)
+    backend.optimize()
+    return count
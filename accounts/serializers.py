@@ -1,14 +1,20 @@
 from django.core.validators import MinLengthValidator
-from rest_framework_simplejwt.tokens import RefreshToken
 
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from .models import (
-    Profile, Contact, Project,
+    ActivityEvent, Profile, Contact, Project,
     ProjectFile, Status, Task, TaskFile,
-    ProjectMessage, TaskMessage,ProjectMember
+    ProjectMessage, TaskMessage,ProjectMember,
+    PerformerCounter, UploadChunk, UploadSession
 )
+from .authentication import refresh_tokens, tokens_for_user
+from .thumbnails import thumbnail_urls
+from django.conf import settings
 from django.contrib.auth.models import User
 
+from .mixins import EagerLoadingMixin
+
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -59,30 +65,43 @@ class UserProfileSerializer(serializers.Serializer):
 class TokenSerializer(serializers.Serializer):
     token = serializers.CharField()
 
-    def get_tokens_for_user(self, user):
-        refresh = RefreshToken.for_user(user)
-        return {
-            'refresh': str(refresh),
-            'access': str(refresh.access_token),
-        }
+    def get_tokens_for_user(self, user, profile=None):
+        return tokens_for_user(user, profile)
+
 
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        return refresh_tokens(attrs['refresh'])
 
-class ProfileSerializer(serializers.ModelSerializer):
+
+class ProfileSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('user',)
     username = serializers.CharField(source='user.username', read_only=True)
+    avatar_thumbnails = serializers.SerializerMethodField()
 
     class Meta:
         model = Profile
-        fields = ['user', 'username', 'avatar', 'first_name', 'last_name']
+        fields = ['user', 'username', 'avatar', 'avatar_thumbnails', 'first_name', 'last_name']
+
+    def get_avatar_thumbnails(self, obj):
+        return thumbnail_urls(obj.avatar, 'profile-avatar', obj.pk, self.context.get('request'))
+
+class ContactSuggestionSerializer(ProfileSerializer):
+    shared_projects = serializers.IntegerField(read_only=True)
+
+    class Meta(ProfileSerializer.Meta):
+        fields = ProfileSerializer.Meta.fields + ['shared_projects']
 
 class ProjectSerializer(serializers.ModelSerializer):
     class Meta:
         model = Project
-        fields = ['id', 'name', 'description', 'soft_deadline', 'deadline', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'description', 'soft_deadline', 'deadline', 'created_at', 'updated_at',
+                  'task_count', 'message_count', 'file_count']
 
 class StatusSerializer(serializers.ModelSerializer):
     class Meta:
         model = Status
-        fields = ['id', 'name', 'project']
+        fields = ['id', 'name', 'project', 'task_count']
 class TaskSerializer(serializers.ModelSerializer):
     status = serializers.PrimaryKeyRelatedField(queryset=Status.objects.all(), required=False, allow_null=True)
 
@@ -96,7 +115,73 @@ class TaskSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class ContactSerializer(serializers.ModelSerializer):
+class PerformerCounterSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('performer__user',)
+    performer = ProfileSerializer(read_only=True)
+
+    class Meta:
+        model = PerformerCounter
+        fields = ['performer', 'task_count']
+
+
+class BulkTaskOperationSerializer(serializers.Serializer):
+    OPERATIONS = ('create', 'move', 'reassign', 'delete')
+    REQUIRED_FIELDS = {
+        'create': ('name', 'soft_deadline', 'deadline', 'status'),
+        'move': ('id', 'status'),
+        'reassign': ('id', 'performer'),
+        'delete': ('id',),
+    }
+
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    id = serializers.IntegerField(required=False)
+    name = serializers.CharField(max_length=255, required=False)
+    description = serializers.CharField(required=False, allow_blank=True)
+    soft_deadline = serializers.DateTimeField(required=False)
+    deadline = serializers.DateTimeField(required=False)
+    status = serializers.IntegerField(required=False)
+    performer = serializers.IntegerField(required=False, allow_null=True)
+
+    def validate(self, attrs):
+        missing = [field for field in self.REQUIRED_FIELDS[attrs['op']] if field not in attrs]
+        if missing:
+            raise serializers.ValidationError({field: 'This field is required.' for field in missing})
+        return attrs
+
+
+class UploadChunkSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadChunk
+        fields = ['index', 'size', 'sha256']
+
+
+class UploadSessionSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    prefetch_related_fields = ('chunks',)
+    task = serializers.PrimaryKeyRelatedField(queryset=Task.objects.all(), required=False, allow_null=True)
+    sha256 = serializers.RegexField(r'^[0-9a-f]{64}$', required=False, allow_blank=True)
+    chunks = UploadChunkSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'task', 'filename', 'description', 'size', 'chunk_size', 'sha256', 'chunks',
+                  'created_at', 'updated_at']
+        read_only_fields = ['chunk_size']
+
+    def validate_filename(self, value):
+        value = value.replace('\\', '/').rsplit('/', 1)[-1].strip()
+        if not value:
+            raise serializers.ValidationError('A file name is required.')
+        return value
+
+    def validate_size(self, value):
+        limit = getattr(settings, 'UPLOAD_MAX_SIZE', 5 * 1024 ** 3)
+        if not 0 < value <= limit:
+            raise serializers.ValidationError(f'Size must be between 1 and {limit} bytes.')
+        return value
+
+
+class ContactSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('to_profile__user',)
     to_profile = ProfileSerializer()
 
     class Meta:
@@ -106,28 +191,68 @@ class ContactSerializer(serializers.ModelSerializer):
 class ProjectFileSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProjectFile
-        fields = ['id', 'file', 'description', 'uploaded_at']
+        fields = ['id', 'file', 'filename', 'description', 'uploaded_at']
+        read_only_fields = ['filename']
 
 class TaskFileSerializer(serializers.ModelSerializer):
     class Meta:
         model = TaskFile
-        fields = ['id', 'file', 'description', 'uploaded_at']
+        fields = ['id', 'file', 'filename', 'description', 'uploaded_at']
+        read_only_fields = ['filename']
 
-class ProjectMessageSerializer(serializers.ModelSerializer):
-    author = ProfileSerializer()
-    related_file = ProjectFileSerializer()
+class ProjectMessageSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('author__user', 'related_file')
+    author = ProfileSerializer(read_only=True)
+    related_file = ProjectFileSerializer(read_only=True)
 
     class Meta:
         model = ProjectMessage
         fields = ['id', 'author', 'project', 'related_comment', 'related_file', 'content', 'time_create', 'time_update']
+        read_only_fields = ['project']
 
-class TaskMessageSerializer(serializers.ModelSerializer):
-    author = ProfileSerializer()
-    related_file = TaskFileSerializer()
+class TaskMessageSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('author__user', 'related_file')
+    author = ProfileSerializer(read_only=True)
+    related_file = TaskFileSerializer(read_only=True)
 
     class Meta:
         model = TaskMessage
         fields = ['id', 'author', 'task', 'related_comment', 'related_file', 'content', 'time_create', 'time_update']
+        read_only_fields = ['task']
+
 
+class BoardTaskSerializer(serializers.ModelSerializer):
+    creator = ProfileSerializer(read_only=True)
+    performer = ProfileSerializer(read_only=True)
+    message_count = serializers.IntegerField(read_only=True)
+    file_count = serializers.IntegerField(read_only=True)
 
+    class Meta:
+        model = Task
+        fields = ['id', 'name', 'description', 'soft_deadline', 'deadline', 'created_at', 'updated_at',
+                  'creator', 'performer', 'message_count', 'file_count']
 
+
+class BoardStatusSerializer(serializers.ModelSerializer):
+    tasks = BoardTaskSerializer(source='board_tasks', many=True, read_only=True)
+
+    class Meta:
+        model = Status
+        fields = ['id', 'name', 'tasks']
+
+
+class BoardSerializer(serializers.ModelSerializer):
+    owner = ProfileSerializer(read_only=True)
+    members = ProfileSerializer(source='board_members', many=True, read_only=True)
+    statuses = BoardStatusSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Project
+        fields = ['id', 'name', 'description', 'soft_deadline', 'deadline', 'created_at', 'updated_at',
+                  'owner', 'members', 'statuses']
+
+
+class ActivityEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ActivityEvent
+        fields = ['id', 'project', 'actor', 'verb', 'target_type', 'target_id', 'data', 'created_at']
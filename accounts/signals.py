@@ -0,0 +1,324 @@
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import activity, caching, contacts, counters, directory, search, storage, thumbnails
+from .authentication import revoke_tokens
+from .broker import project_channel, publish_access_changed, publish_on_commit, task_channel
+from .access import membership_cache
+from .models import (
+    ActivityEvent, Profile, Project, ProjectFile, ProjectMember, ProjectMessage,
+    Status, Task, TaskFile, TaskMessage,
+)
+
+
+@receiver(post_save, sender=ProjectMember)
+@receiver(post_delete, sender=ProjectMember)
+def invalidate_member_access(sender, instance, **kwargs):
+    membership_cache.invalidate(instance.project_id, instance.member_id)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def invalidate_project_access(sender, instance, **kwargs):
+    membership_cache.invalidate(instance.pk)
+
+
+@receiver(m2m_changed, sender=Project.members.through)
+def invalidate_members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        membership_cache.invalidate(instance.pk)
+    elif pk_set:
+        for project_id in pk_set:
+            membership_cache.invalidate(project_id, instance.pk)
+    else:
+        membership_cache.clear()
+
+
+@receiver(post_init, sender=Task)
+def remember_task_placement(sender, instance, **kwargs):
+    fields = instance.__dict__
+    instance._counted_placement = (fields.get('status_id'), fields.get('performer_id')) if instance.pk else (None, None)
+
+
+@receiver(pre_save, sender=Task)
+@receiver(pre_delete, sender=Task)
+def resolve_task_projects(sender, instance, **kwargs):
+    # The projects of the saved and the new status, looked up once for the
+    # counter, cache, search and activity receivers of this write.
+    instance._saved_status_id = instance._counted_placement[0]
+    instance._status_projects = counters.task_project_ids(instance._saved_status_id, instance.status_id)
+
+
+@receiver(post_save, sender=Task)
+def count_task_saved(sender, instance, **kwargs):
+    counters.task_moved(*instance._counted_placement, instance.status_id, instance.performer_id,
+                        projects=instance._status_projects)
+    instance._counted_placement = (instance.status_id, instance.performer_id)
+
+
+@receiver(post_delete, sender=Task)
+def count_task_deleted(sender, instance, **kwargs):
+    counters.task_moved(*instance._counted_placement, None, None, projects=instance._status_projects)
+
+
+COUNTED_ROWS = {
+    ProjectMessage: 'message_count',
+    TaskMessage: 'message_count',
+    ProjectFile: 'file_count',
+    TaskFile: 'file_count',
+}
+
+
+def counted_projects(instance):
+    if isinstance(instance, (ProjectMessage, ProjectFile)):
+        return Project.objects.filter(pk=instance.project_id)
+    return counters.projects_of_task(instance.task_id)
+
+
+def count_row(instance, delta):
+    projects = counted_projects(instance)
+    counters.bump(projects, **{COUNTED_ROWS[type(instance)]: delta})
+    # The counters are part of the cached project responses.
+    if isinstance(instance, (ProjectMessage, ProjectFile)):
+        caching.bump_projects_on_commit([instance.project_id])
+    else:
+        caching.bump_projects_on_commit(projects.values_list('pk', flat=True))
+
+
+def count_row_created(sender, instance, created, **kwargs):
+    if created:
+        count_row(instance, 1)
+
+
+def count_row_deleted(sender, instance, **kwargs):
+    count_row(instance, -1)
+
+
+for model in COUNTED_ROWS:
+    post_save.connect(count_row_created, sender=model)
+    post_delete.connect(count_row_deleted, sender=model)
+
+
+@receiver(post_save, sender=ProjectFile)
+@receiver(post_save, sender=TaskFile)
+def acquire_blob(sender, instance, created, **kwargs):
+    if created:
+        storage.acquire(instance.file.name, instance.file.storage)
+
+
+@receiver(post_delete, sender=ProjectFile)
+@receiver(post_delete, sender=TaskFile)
+def release_blob(sender, instance, **kwargs):
+    storage.release(instance.file.name, instance.file.storage)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_profile_responses(sender, instance, **kwargs):
+    caching.bump(caching.PROFILES)
+
+
+@receiver(post_init, sender=Project)
+def remember_project_owner(sender, instance, **kwargs):
+    instance._cached_owner_id = instance.__dict__.get('owner_id')
+
+
+@receiver(post_save, sender=Project)
+def recheck_socket_access_owner(sender, instance, created, **kwargs):
+    if not created and instance.owner_id != instance._cached_owner_id:
+        publish_access_changed(instance.pk)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def invalidate_project_responses(sender, instance, **kwargs):
+    caching.bump(*caching.project_audience(instance.pk, instance.owner_id, instance._cached_owner_id))
+    instance._cached_owner_id = instance.owner_id
+
+
+@receiver(post_save, sender=ProjectMember)
+@receiver(post_delete, sender=ProjectMember)
+def invalidate_member_responses(sender, instance, **kwargs):
+    caching.bump(caching.user_projects_scope(instance.member_id))
+
+
+@receiver(m2m_changed, sender=Project.members.through)
+def invalidate_members_changed_responses(sender, instance, action, reverse, pk_set, **kwargs):
+    if action.startswith('post_'):
+        profile_ids = [instance.pk] if reverse else (pk_set or ())
+        caching.bump(*(caching.user_projects_scope(pk) for pk in profile_ids))
+        if not reverse:
+            caching.bump(*caching.project_audience(instance.pk))
+
+
+@receiver(post_save, sender=Status)
+@receiver(post_delete, sender=Status)
+def invalidate_status_responses(sender, instance, **kwargs):
+    caching.bump(*caching.project_audience(instance.project_id))
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_responses(sender, instance, **kwargs):
+    project_ids = set(instance._status_projects.values())
+    caching.bump(*{scope for project_id in project_ids for scope in caching.project_audience(project_id)})
+
+
+@receiver(post_save, sender=ProjectMessage)
+@receiver(post_save, sender=TaskMessage)
+def publish_message_saved(sender, instance, created, **kwargs):
+    from .serializers import ProjectMessageSerializer, TaskMessageSerializer
+
+    if sender is ProjectMessage:
+        channel, serializer_class = project_channel(instance.project_id), ProjectMessageSerializer
+    else:
+        channel, serializer_class = task_channel(instance.task_id), TaskMessageSerializer
+    # Serialized after the commit, and only for channels someone listens to.
+    publish_on_commit(channel, lambda: {
+        'type': 'message.created' if created else 'message.updated',
+        'message': serializer_class(instance).data,
+    })
+
+
+@receiver(post_delete, sender=ProjectMessage)
+@receiver(post_delete, sender=TaskMessage)
+def publish_message_deleted(sender, instance, **kwargs):
+    if sender is ProjectMessage:
+        channel = project_channel(instance.project_id)
+    else:
+        channel = task_channel(instance.task_id)
+    publish_on_commit(channel, lambda: {'type': 'message.deleted', 'message': {'id': instance.pk}})
+
+
+@receiver(post_save, sender=ProjectMember)
+def recheck_socket_access_joined(sender, instance, created, **kwargs):
+    # Open sockets only need checking when access may have been lost.
+    if not created:
+        publish_access_changed(instance.project_id)
+
+
+@receiver(post_delete, sender=ProjectMember)
+def recheck_socket_access_left(sender, instance, **kwargs):
+    publish_access_changed(instance.project_id)
+
+
+@receiver(m2m_changed, sender=Project.members.through)
+def recheck_socket_access_removed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_remove', 'post_clear'):
+        for project_id in (pk_set or ()) if reverse else (instance.pk,):
+            publish_access_changed(project_id)
+
+
+@receiver(post_delete, sender=Project)
+def recheck_socket_access_deleted(sender, instance, **kwargs):
+    publish_access_changed(instance.pk)
+
+
+# Fields of a task that end up in the search index.
+INDEXED_TASK_FIELDS = {'name', 'description', 'status', 'status_id'}
+
+
+@receiver(post_save, sender=Task)
+def index_task(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not INDEXED_TASK_FIELDS & set(update_fields):
+        return
+    search.index_rows('task', [instance.pk])
+    previous, current, projects = instance._saved_status_id, instance.status_id, instance._status_projects
+    if not created and previous != current and projects.get(previous) != projects.get(current):
+        # Messages are indexed under the project of their task.
+        search.index_task_messages(instance.pk)
+
+
+@receiver(post_save, sender=ProjectMessage)
+@receiver(post_save, sender=TaskMessage)
+def index_message(sender, instance, **kwargs):
+    search.index_rows(search.KIND_OF[sender], [instance.pk])
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=ProjectMessage)
+@receiver(post_delete, sender=TaskMessage)
+def unindex_row(sender, instance, **kwargs):
+    search.remove_rows(search.KIND_OF[sender], [instance.pk])
+
+
+def verb(created):
+    return ActivityEvent.CREATED if created else ActivityEvent.UPDATED
+
+
+@receiver(post_save, sender=Task)
+def record_task_activity(sender, instance, created, **kwargs):
+    project_id = instance._status_projects.get(instance.status_id)
+    activity.record(project_id, verb(created), 'task', instance.pk, instance.creator_id if created else None,
+                    {'name': instance.name, 'status': instance.status_id})
+
+
+@receiver(post_save, sender=ProjectMessage)
+def record_project_message_activity(sender, instance, created, **kwargs):
+    activity.record(instance.project_id, verb(created), 'project_message', instance.pk, instance.author_id,
+                    {'excerpt': activity.excerpt(instance.content)})
+
+
+@receiver(post_save, sender=TaskMessage)
+def record_task_message_activity(sender, instance, created, **kwargs):
+    project_id = Task.objects.filter(pk=instance.task_id).values_list('status__project_id', flat=True).first()
+    activity.record(project_id, verb(created), 'task_message', instance.pk, instance.author_id,
+                    {'task': instance.task_id, 'excerpt': activity.excerpt(instance.content)})
+
+
+@receiver(post_save, sender=ProjectFile)
+def record_project_file_activity(sender, instance, created, **kwargs):
+    activity.record(instance.project_id, verb(created), 'project_file', instance.pk,
+                    data={'filename': instance.filename})
+
+
+@receiver(post_save, sender=ProjectMember)
+def record_member_activity(sender, instance, created, **kwargs):
+    if created:
+        activity.record(instance.project_id, ActivityEvent.CREATED, 'project_member', instance.pk,
+                        data={'member': instance.member_id})
+
+
+@receiver(m2m_changed, sender=Project.members.through)
+def record_members_added(sender, instance, action, reverse, pk_set, **kwargs):
+    # members.add() inserts the through rows without saving them one by one.
+    if action != 'post_add' or not pk_set:
+        return
+    rows = ProjectMember.objects.filter(**{'member': instance, 'project__in': pk_set} if reverse
+                                        else {'project': instance, 'member__in': pk_set})
+    for pk, project_id, member_id in rows.values_list('pk', 'project_id', 'member_id'):
+        activity.record(project_id, ActivityEvent.CREATED, 'project_member', pk, data={'member': member_id})
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def revoke_deactivated_tokens(sender, instance, created, **kwargs):
+    # Claim-based authentication never reads is_active, so deactivating a
+    # user must revoke the tokens it already holds.
+    if not created and not instance.is_active:
+        profile_id = Profile.objects.filter(user=instance).values_list('pk', flat=True).first()
+        if profile_id is not None:
+            revoke_tokens(profile_id)
+
+
+@receiver(post_save, sender=Profile)
+def index_profile_names(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'first_name', 'last_name', 'user'} & set(update_fields):
+        directory.index_profiles([instance.pk])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def index_username(sender, instance, created, update_fields=None, **kwargs):
+    # A new user has no profile yet; logins save only password or last_login.
+    if not created and (update_fields is None or 'username' in update_fields):
+        directory.index_profiles(Profile.objects.filter(user=instance).values_list('pk', flat=True))
+
+
+def invalidate_avatar_responses(profile_id):
+    caching.bump(caching.PROFILES)
+    caching.bump_projects_on_commit(contacts.project_ids(profile_id).values_list('pk', flat=True))
+
+
+thumbnails.register(Profile, 'avatar', crop=True, changed=invalidate_avatar_responses)
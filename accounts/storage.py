@@ -0,0 +1,136 @@
+import hashlib
+import os
+import re
+import uuid
+from collections import Counter
+
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+BLOB_PREFIX = 'blobs'
+BLOB_NAME = re.compile(rf'^{BLOB_PREFIX}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/(?P<digest>[0-9a-f]{{64}})$')
+
+def blob_name(digest):
+    return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}'
+
+
+def digest_of(name):
+    """SHA-256 a stored name was derived from, or None for names outside the blob layout."""
+    match = BLOB_NAME.match(name or '')
+    return match['digest'] if match else None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that keeps one copy of each distinct content.
+
+    Content is hashed while it is streamed to a temporary file, which is
+    then moved to ``blobs/<ab>/<cd>/<sha256>`` unless that blob already
+    exists; the name passed in only matters for its absence. Rows point at
+    blobs through their file name and ``Blob.ref_count`` tracks how many do,
+    so ``delete`` leaves blobs that are still referenced alone.
+
+    Saving pins the blob with a reference of its own until the transaction
+    commits, so it must run in the transaction that creates the row (the
+    file models save atomically): that row's post_save takes the row's
+    reference, and a failed insert rolls the pin back with it.
+    """
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        temporary = self.path(f'{BLOB_PREFIX}/tmp/{uuid.uuid4().hex}')
+        os.makedirs(os.path.dirname(temporary), exist_ok=True)
+        try:
+            with open(temporary, 'wb') as handle:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    handle.write(chunk)
+            final = blob_name(digest.hexdigest())
+            path = self.path(final)
+            # A blob is only reused once a reference to it is taken: a
+            # concurrent last release deletes it otherwise.
+            if os.path.exists(path) and reference(digest.hexdigest()):
+                os.remove(temporary)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True, mode=self.directory_permissions_mode or 0o777)
+                os.replace(temporary, path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(path, self.file_permissions_mode)
+                add_reference(digest.hexdigest(), lambda: os.path.getsize(path))
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        transaction.on_commit(lambda: release(final, self))
+        return final
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is the digest; the requested one is never used.
+        return name
+
+    def delete(self, name):
+        from .models import Blob
+
+        digest = digest_of(name)
+        if digest is not None and Blob.objects.filter(digest=digest, ref_count__gt=0).exists():
+            return
+        super().delete(name)
+
+
+def file_storage():
+    return storages['files']
+
+
+def reference(digest):
+    """Take one more reference to blob ``digest`` if it still has any; return whether it did."""
+    from .models import Blob
+
+    return bool(Blob.objects.filter(digest=digest, ref_count__gt=0).update(ref_count=F('ref_count') + 1))
+
+
+def add_reference(digest, size):
+    """Take one more reference to blob ``digest``, creating its row with ``size()`` bytes if needed."""
+    from .models import Blob
+
+    if Blob.objects.filter(digest=digest).update(ref_count=F('ref_count') + 1):
+        return
+    try:
+        with transaction.atomic():
+            Blob.objects.create(digest=digest, size=size(), ref_count=1)
+    except IntegrityError:
+        Blob.objects.filter(digest=digest).update(ref_count=F('ref_count') + 1)
+
+
+def acquire(name, storage=None):
+    """Count one more row pointing at the blob stored as ``name``."""
+    digest = digest_of(name)
+    if digest is None:
+        return
+    add_reference(digest, lambda: (storage or file_storage()).size(name))
+
+
+def release(name, storage=None):
+    """
+    Count one row less for the blob stored as ``name``; the last release
+    deletes the blob once the transaction commits.
+    """
+    release_many([name], storage)
+
+
+def release_many(names, storage=None):
+    """``release`` for rows deleted in bulk, with one ``UPDATE`` per distinct number of releases of a blob."""
+    from .models import Blob
+
+    counts = Counter(digest for digest in map(digest_of, names) if digest is not None)
+    by_count = {}
+    for digest, count in counts.items():
+        by_count.setdefault(count, []).append(digest)
+    for count, digests in by_count.items():
+        Blob.objects.filter(digest__in=digests).update(ref_count=F('ref_count') - count)
+    unreferenced = Blob.objects.filter(digest__in=counts, ref_count__lte=0)
+    dead = list(unreferenced.values_list('digest', flat=True))
+    if dead:
+        unreferenced.filter(digest__in=dead).delete()
+        storage = storage or file_storage()
+        transaction.on_commit(lambda: [storage.delete(blob_name(digest)) for digest in dead], robust=True)
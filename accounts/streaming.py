@@ -0,0 +1,32 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+_EXHAUSTED = object()
+
+
+def is_asgi(request):
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+async def aiterate(iterator):
+    """
+    Async iterator over a sync one, advancing it one item at a time on the
+    request's sync thread, so database reads stay on one connection.
+    """
+    advance = sync_to_async(next)
+    try:
+        while (item := await advance(iterator, _EXHAUSTED)) is not _EXHAUSTED:
+            yield item
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+def streaming_content(request, iterator):
+    """
+    ``iterator`` in the form ``StreamingHttpResponse`` serves without
+    collecting it first: Django consumes a sync iterator under ASGI (and an
+    async one under WSGI) into a list before sending anything.
+    """
+    return aiterate(iter(iterator)) if is_asgi(request) else iterator
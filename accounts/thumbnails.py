@@ -0,0 +1,251 @@
+import hashlib
+import logging
+import os
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.http import Http404, HttpResponseRedirect
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework.generics import GenericAPIView, get_object_or_404
+from rest_framework.permissions import AllowAny
+
+from . import jobs
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_PREFIX = 'thumbnails'
+
+# Sources that cannot be rendered: missing, undecodable (UnidentifiedImageError
+# is an OSError) or over Pillow's pixel limit.
+UNUSABLE_IMAGE = (OSError, Image.DecompressionBombError)
+
+
+def thumbnail_sizes():
+    return tuple(getattr(settings, 'THUMBNAIL_SIZES', (48, 128, 256)))
+
+
+def thumbnail_name(name, size):
+    """Where the ``size`` thumbnail of the image stored as ``name`` lives; derived, never stored."""
+    return f'{THUMBNAIL_PREFIX}/{name}.{size}.{"png" if name.lower().endswith(".png") else "jpg"}'
+
+
+def image_format(image):
+    transparent = 'A' in image.mode or 'transparency' in image.info
+    return 'PNG' if transparent else 'JPEG'
+
+
+def encode(image, image_format):
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    if image_format == 'JPEG':
+        image.save(buffer, 'JPEG', quality=85, optimize=True, progressive=True)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def normalize(file, max_dimension):
+    """
+    Re-encode an image: EXIF orientation applied, metadata
+    dropped, the longest side capped at ``max_dimension``, JPEG unless it
+    has transparency. Returns ``(bytes, extension)``.
+    """
+    image = Image.open(file)
+    image.draft('RGB', (max_dimension, max_dimension))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    output = image_format(image)
+    return encode(image, output), '.png' if output == 'PNG' else '.jpg'
+
+
+def render_thumbnail(storage, name, size, crop):
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        image.draft('RGB', (size, size))
+        image = ImageOps.exif_transpose(image)
+        if crop:
+            image = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        else:
+            image.thumbnail((size, size), Image.LANCZOS)
+        output = 'PNG' if thumbnail_name(name, size).endswith('.png') else 'JPEG'
+        return encode(image, output)
+
+
+def ensure_thumbnail(storage, name, size, crop):
+    """Name of the ``size`` thumbnail of ``name``, rendering it first if it does not exist yet."""
+    target = thumbnail_name(name, size)
+    if not storage.exists(target):
+        saved = storage.save(target, ContentFile(render_thumbnail(storage, name, size, crop)))
+        if saved != target:
+            # A concurrent request stored it first; ours went to a free name.
+            storage.delete(saved)
+    return target
+
+
+def generate_thumbnails(storage, name, crop):
+    for size in thumbnail_sizes():
+        try:
+            ensure_thumbnail(storage, name, size, crop)
+        except UNUSABLE_IMAGE:
+            logger.exception('Could not render the %s thumbnail of %s', size, name)
+
+
+def delete_thumbnails(storage, name):
+    for size in thumbnail_sizes():
+        storage.delete(thumbnail_name(name, size))
+
+
+def registered_field(label, field_name):
+    model = apps.get_model(label)
+    _, crop, max_dimension, changed = REGISTRY[model]
+    return model, model._meta.get_field(field_name).storage, crop, max_dimension, changed
+
+
+@jobs.task(queue='images')
+def process_image(label, pk, field_name, name):
+    """
+    Replace the freshly uploaded image ``name`` with its normalized version,
+    then queue its thumbnails. Does nothing once the row points elsewhere.
+    """
+    model, storage, crop, max_dimension, changed = registered_field(label, field_name)
+    current = model.objects.filter(pk=pk, **{field_name: name})
+    if not current.exists():
+        return
+    try:
+        with storage.open(name, 'rb') as source:
+            content, extension = normalize(source, max_dimension or getattr(settings, 'IMAGE_MAX_DIMENSION', 2048))
+    except (UnidentifiedImageError, Image.DecompressionBombError):
+        logger.warning('Not normalizing %s of %s %s: not a usable image', name, label, pk)
+        return
+    normalized = storage.save(os.path.splitext(name)[0] + extension, ContentFile(content))
+    with transaction.atomic():
+        if not current.update(**{field_name: normalized}):
+            storage.delete(normalized)
+            return
+        render_thumbnails.delay(label, field_name, normalized)
+        if changed is not None:
+            # The update sends no post_save.
+            transaction.on_commit(lambda: changed(pk))
+    storage.delete(name)
+    # Thumbnails the lazy endpoint rendered from the original in the meantime.
+    delete_thumbnails(storage, name)
+
+
+@jobs.task(queue='images')
+def render_thumbnails(label, field_name, name):
+    _, storage, crop, _, _ = registered_field(label, field_name)
+    if storage.exists(name):
+        generate_thumbnails(storage, name, crop)
+
+
+@jobs.task(queue='images')
+def remove_thumbnails(label, field_name, name):
+    _, storage, _, _, _ = registered_field(label, field_name)
+    delete_thumbnails(storage, name)
+
+
+def version(name):
+    return hashlib.md5(name.encode(), usedforsecurity=False).hexdigest()[:8]
+
+
+def thumbnail_urls(fieldfile, url_name, pk, request=None):
+    """``{size: url}`` of the lazy thumbnail endpoint, or None without an image."""
+    from django.urls import reverse
+
+    if not fieldfile:
+        return None
+    urls = {}
+    for size in thumbnail_sizes():
+        url = f'{reverse(url_name, args=[pk, size])}?v={version(fieldfile.name)}'
+        urls[str(size)] = request.build_absolute_uri(url) if request is not None else url
+    return urls
+
+
+def register(model, field_name, crop=False, max_dimension=None, changed=None):
+    """
+    Run uploads to ``model.<field_name>`` through the pipeline. Saving a new
+    image queues a job that normalizes it and then renders its thumbnails;
+    the thumbnails of a replaced or deleted image are removed by another.
+    Nothing but the job rows is written on the request path.
+
+    ``changed(pk)`` is called once the job's swap to the normalized image
+    commits, for invalidating what the row's post_save would have.
+    """
+    uid = f'thumbnails:{model._meta.label}.{field_name}'
+    label = model._meta.label
+    stored, replaced = f'_{field_name}_stored', f'_{field_name}_replaced'
+
+    def remember_image(sender, instance, **kwargs):
+        value = instance.__dict__.get(field_name)
+        instance.__dict__[stored] = value if isinstance(value, str) else ''
+
+    def find_replaced(sender, instance, update_fields=None, **kwargs):
+        instance.__dict__.pop(replaced, None)
+        if field_name not in instance.__dict__ or (update_fields is not None and field_name not in update_fields):
+            return
+        fieldfile = getattr(instance, field_name)
+        if (fieldfile.name or '') == instance.__dict__.get(stored, '') and (not fieldfile or fieldfile._committed):
+            return
+        # The remembered name goes stale when a job swaps the image, so only
+        # the database can say which image this save replaces.
+        previous = ''
+        if instance.pk is not None:
+            previous = sender._default_manager.filter(pk=instance.pk).values_list(field_name, flat=True).first()
+        instance.__dict__[replaced] = previous or ''
+
+    def schedule_processing(sender, instance, **kwargs):
+        previous = instance.__dict__.pop(replaced, None)
+        if previous is None:
+            return
+        current = getattr(instance, field_name).name or ''
+        if previous and previous != current:
+            remove_thumbnails.delay(label, field_name, previous)
+        if current and current != previous:
+            process_image.delay(label, instance.pk, field_name, current,
+                                idempotency_key=f'process_image:{label}:{instance.pk}:{current}')
+        instance.__dict__[stored] = current
+
+    def drop_thumbnails(sender, instance, **kwargs):
+        fieldfile = instance.__dict__.get(field_name) and getattr(instance, field_name)
+        if fieldfile:
+            remove_thumbnails.delay(label, field_name, fieldfile.name)
+
+    post_init.connect(remember_image, sender=model, weak=False, dispatch_uid=uid)
+    pre_save.connect(find_replaced, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(schedule_processing, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(drop_thumbnails, sender=model, weak=False, dispatch_uid=uid)
+    REGISTRY[model] = (field_name, crop, max_dimension, changed)
+
+
+REGISTRY = {}
+
+
+class ThumbnailView(GenericAPIView):
+    """
+    Redirect to a thumbnail of a registered image field, rendering it on the
+    spot when the background step has not produced it (yet).
+    """
+    permission_classes = [AllowAny]
+    queryset = None
+
+    def get(self, request, pk, size):
+        if size not in thumbnail_sizes():
+            raise Http404
+        instance = get_object_or_404(self.get_queryset(), pk=pk)
+        field_name, crop, _, _ = REGISTRY[self.get_queryset().model]
+        fieldfile = getattr(instance, field_name)
+        if not fieldfile:
+            raise Http404
+        try:
+            name = ensure_thumbnail(fieldfile.storage, fieldfile.name, size, crop)
+        except UNUSABLE_IMAGE:
+            raise Http404
+        response = HttpResponseRedirect(fieldfile.storage.url(name))
+        # The URL carries the image version, so a redirect never goes stale.
+        response['Cache-Control'] = 'public, max-age=86400'
+        return response
@@ -0,0 +1,213 @@
+import json
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+
+from . import caching, search, storage
+from .counters import rebuild_counters
+from .models import (
+    Profile, Project, ProjectFile, ProjectMember, ProjectMessage,
+    Status, Task, TaskFile, TaskMessage
+)
+
+FORMAT = 'projman.export'
+VERSION = 1
+
+# Parents before children, so an import can map every foreign key as it goes.
+EXPORTED_MODELS = (Project, Status, ProjectMember, Task, ProjectFile, TaskFile, ProjectMessage, TaskMessage)
+
+
+class ExportFormatError(ValueError):
+    pass
+
+
+class ExportEncoder(DjangoJSONEncoder):
+    """Keeps full microsecond precision, which ``DjangoJSONEncoder`` rounds to milliseconds."""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def label(model):
+    return model._meta.label_lower
+
+
+def exported_fields(model):
+    """Concrete columns of ``model`` except the primary key and the denormalized counters."""
+    return [field for field in model._meta.concrete_fields if not field.primary_key and (
+        field.editable or getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False))]
+
+
+def project_rows(model, project_id):
+    lookups = {
+        Project: Q(pk=project_id),
+        Status: Q(project_id=project_id),
+        ProjectMember: Q(project_id=project_id),
+        Task: Q(status__project_id=project_id),
+        ProjectFile: Q(project_id=project_id),
+        TaskFile: Q(task__status__project_id=project_id),
+        ProjectMessage: Q(project_id=project_id),
+        TaskMessage: Q(task__status__project_id=project_id),
+    }
+    return model.objects.filter(lookups[model]).order_by('pk')
+
+
+def export_lines(project_id, chunk_size=2000):
+    """
+    Yield a project as NDJSON lines: a header, the profiles it references
+    (by username, so the export can be loaded into another database) and
+    then every row in dependency order.
+
+    Rows are read with ``values().iterator()``, so memory use does not grow
+    with the size of the project, and in one transaction, so the lines are a
+    consistent snapshot even while the project is being written to.
+    """
+    with transaction.atomic():
+        yield from _export_lines(project_id, chunk_size)
+
+
+def _export_lines(project_id, chunk_size):
+    yield dump({'format': FORMAT, 'version': VERSION, 'project': project_id})
+
+    profile_ids = set()
+    for model, fields in (
+        (Project, ['owner_id']), (ProjectMember, ['member_id']), (Task, ['creator_id', 'performer_id']),
+        (ProjectMessage, ['author_id']), (TaskMessage, ['author_id']),
+    ):
+        for row in project_rows(model, project_id).order_by().values_list(*fields).distinct().iterator(chunk_size):
+            profile_ids.update(pk for pk in row if pk is not None)
+    profiles = Profile.objects.filter(pk__in=profile_ids).order_by('pk').values_list('pk', 'user__username')
+    for pk, username in profiles.iterator(chunk_size):
+        yield dump({'model': label(Profile), 'pk': pk, 'fields': {'username': username}})
+
+    for model in EXPORTED_MODELS:
+        attnames = [field.attname for field in exported_fields(model)]
+        for row in project_rows(model, project_id).values('pk', *attnames).iterator(chunk_size):
+            yield dump({'model': label(model), 'pk': row.pop('pk'), 'fields': row})
+
+
+def buffered(lines, size=64 * 1024):
+    """Join lines into chunks of about ``size`` characters for fewer, larger writes."""
+    chunk, length = [], 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(chunk)
+            chunk, length = [], 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+def dump(record):
+    return json.dumps(record, cls=ExportEncoder, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def timestamp_fields(model):
+    return [field for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+
+
+class Importer:
+    """
+    Load an export as a new project, inserting rows with ``bulk_create`` in
+    batches of ``batch_size``. Primary keys are reassigned; foreign keys are
+    translated through the ids created so far, and profiles are matched by
+    username.
+    """
+    foreign_keys = {
+        Project: {'owner_id': Profile},
+        Status: {'project_id': Project},
+        ProjectMember: {'project_id': Project, 'member_id': Profile},
+        Task: {'status_id': Status, 'creator_id': Profile, 'performer_id': Profile},
+        ProjectFile: {'project_id': Project},
+        TaskFile: {'task_id': Task},
+        ProjectMessage: {'author_id': Profile, 'project_id': Project,
+                         'related_comment_id': ProjectMessage, 'related_file_id': ProjectFile},
+        TaskMessage: {'author_id': Profile, 'task_id': Task,
+                      'related_comment_id': TaskMessage, 'related_file_id': TaskFile},
+    }
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.models = {label(model): model for model in (Profile, *EXPORTED_MODELS)}
+        self.ids = {model: {} for model in self.models.values()}
+        self.pending_model = None
+        self.pending = []
+        self.counts = {}
+
+    def load(self, lines):
+        """Import ``lines`` in one transaction and return the new project."""
+        records = (json.loads(line) for line in lines if line.strip())
+        header = next(records, None)
+        if not header or header.get('format') != FORMAT or header.get('version') != VERSION:
+            raise ExportFormatError('Not a project export.')
+        with transaction.atomic():
+            for record in records:
+                model = self.models.get(record.get('model'))
+                if model is None:
+                    raise ExportFormatError(f'Unknown model "{record.get("model")}".')
+                if model is Profile:
+                    self.map_profile(record)
+                else:
+                    self.add(model, record)
+            self.flush()
+            projects = list(self.ids[Project].values())
+            if len(projects) != 1:
+                raise ExportFormatError('An export must contain exactly one project.')
+            rebuild_counters(project_ids=projects)
+            search.reindex_project(projects[0])
+        project_id = projects[0]
+        caching.bump(*caching.project_audience(project_id))
+        return Project.objects.get(pk=project_id)
+
+    def map_profile(self, record):
+        username = record['fields']['username']
+        pk = Profile.objects.filter(user__username=username).values_list('pk', flat=True).first()
+        if pk is None:
+            raise ExportFormatError(f'No profile with username "{username}".')
+        self.ids[Profile][record['pk']] = pk
+
+    def add(self, model, record):
+        if model is not self.pending_model or len(self.pending) >= self.batch_size:
+            self.flush()
+            self.pending_model = model
+        fields = dict(record['fields'])
+        for attname, target in self.foreign_keys[model].items():
+            old = fields.get(attname)
+            if old is None:
+                continue
+            if old not in self.ids[target] and target is model:
+                # A reply to a row of the current batch: insert the batch first.
+                self.flush()
+                self.pending_model = model
+            if old not in self.ids[target]:
+                raise ExportFormatError(f'{label(model)} {record["pk"]} references unknown '
+                                        f'{label(target)} {old}.')
+            fields[attname] = self.ids[target][old]
+        self.pending.append((record['pk'], model(**fields)))
+
+    def flush(self):
+        if not self.pending:
+            return
+        model = self.pending_model
+        timestamps = timestamp_fields(model)
+        exported = [[getattr(instance, field.attname) for field in timestamps] for _, instance in self.pending]
+        created = model.objects.bulk_create([instance for _, instance in self.pending])
+        for (old, _), instance, values in zip(self.pending, created, exported):
+            self.ids[model][old] = instance.pk
+            # bulk_create stamps auto_now/auto_now_add fields with the import
+            # time; put the exported values back.
+            for field, value in zip(timestamps, values):
+                setattr(instance, field.attname, value)
+            if model in (ProjectFile, TaskFile):
+                # bulk_create skips the signal that references the blob.
+                storage.acquire(instance.file.name, instance.file.storage)
+        if timestamps:
+            model.objects.bulk_update(created, [field.name for field in timestamps], batch_size=self.batch_size)
+        self.counts[model] = self.counts.get(model, 0) + len(created)
+        self.pending = []
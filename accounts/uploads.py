@@ -0,0 +1,193 @@
+import hashlib
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, ValidationError
+
+from .models import ProjectFile, TaskFile, UploadChunk, UploadSession
+
+CHUNK_PREFIX = 'upload_chunks'
+
+
+def chunk_size_setting():
+    return getattr(settings, 'UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+
+
+def chunk_count(session):
+    return math.ceil(session.size / session.chunk_size)
+
+
+def expected_chunk_size(session, index):
+    return min(session.chunk_size, session.size - index * session.chunk_size)
+
+
+class HashingReader:
+    """
+    File-like wrapper hashing and counting everything read through it.
+
+    Reading more than ``limit`` bytes raises, so an oversized body is
+    rejected after ``limit + 1`` bytes instead of being stored.
+    """
+
+    def __init__(self, stream, limit=None):
+        self.stream = stream
+        self.limit = limit
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size=-1):
+        if self.limit is not None:
+            allowed = self.limit - self.size + 1
+            size = allowed if size is None or size < 0 else min(size, allowed)
+        data = self.stream.read(size)
+        self.size += len(data)
+        if self.limit is not None and self.size > self.limit:
+            raise ValidationError({'detail': f'Chunk is larger than {self.limit} bytes.'})
+        self.hash.update(data)
+        return data
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+
+class ChunkReader:
+    """Reads the stored chunks of a session back to back as one stream."""
+
+    def __init__(self, names, storage=default_storage):
+        self.names = list(names)
+        self.storage = storage
+        self.current = None
+
+    def read(self, size=-1):
+        while self.names or self.current is not None:
+            if self.current is None:
+                self.current = self.storage.open(self.names.pop(0), 'rb')
+            data = self.current.read(size)
+            if data:
+                return data
+            self.current.close()
+            self.current = None
+        return b''
+
+    def close(self):
+        if self.current is not None:
+            self.current.close()
+            self.current = None
+
+
+def write_chunk(session, index, stream, sha256=''):
+    """
+    Store chunk ``index`` of ``session`` from ``stream`` while hashing it.
+
+    A chunk that is already stored with the same ``sha256`` is kept without
+    reading the body, so clients can blindly retry after a dropped
+    connection. Returns ``(chunk, written)``.
+    """
+    if not 0 <= index < chunk_count(session):
+        raise ValidationError({'detail': f'Chunk index must be between 0 and {chunk_count(session) - 1}.'})
+    existing = UploadChunk.objects.filter(session=session, index=index).first()
+    if existing is not None and sha256 and existing.sha256 == sha256:
+        return existing, False
+
+    expected = expected_chunk_size(session, index)
+    reader = HashingReader(stream, limit=expected)
+    name = default_storage.save(f'{CHUNK_PREFIX}/{session.pk}-{index}', File(reader, name=f'{session.pk}-{index}'))
+    if reader.size != expected or (sha256 and reader.hexdigest() != sha256):
+        default_storage.delete(name)
+        if reader.size != expected:
+            raise ValidationError({'detail': f'Chunk {index} must be {expected} bytes, got {reader.size}.'})
+        raise ValidationError({'detail': f'Checksum mismatch for chunk {index}.'})
+
+    chunk, _ = UploadChunk.objects.update_or_create(
+        session=session, index=index, defaults={'size': reader.size, 'sha256': reader.hexdigest(), 'name': name})
+    if existing is not None and existing.name != name:
+        default_storage.delete(existing.name)
+    session.save(update_fields=['updated_at'])
+    return chunk, True
+
+
+def missing_chunks(session, chunks=None):
+    if chunks is None:
+        chunks = session.chunks.values_list('index', flat=True)
+    return sorted(set(range(chunk_count(session))) - set(chunks))
+
+
+def complete(session):
+    """
+    Assemble the chunks of ``session`` into a ``ProjectFile``/``TaskFile``.
+
+    The file is stored, the row created and the session deleted in one
+    transaction, so a file row only ever appears for a complete upload and a
+    session can be finalized only once.
+    """
+    chunks = list(session.chunks.order_by('index').values_list('index', 'name'))
+    if missing_chunks(session, [index for index, _ in chunks]):
+        raise ValidationError({'detail': 'Upload is incomplete.'})
+    names = [name for _, name in chunks]
+
+    fields = {'description': session.description, 'filename': session.filename}
+    if session.task_id is not None:
+        instance = TaskFile(task_id=session.task_id, **fields)
+    else:
+        instance = ProjectFile(project_id=session.project_id, **fields)
+    reader = HashingReader(ChunkReader(names))
+    try:
+        with transaction.atomic():
+            try:
+                instance.file.save(session.filename, File(reader, name=session.filename), save=False)
+            finally:
+                reader.stream.close()
+            if session.sha256 and reader.hexdigest() != session.sha256:
+                raise ValidationError({'detail': 'Checksum mismatch for the assembled file.'})
+            deleted, _ = UploadSession.objects.filter(pk=session.pk).delete()
+            if not deleted:
+                raise NotFound('Upload session not found.')
+            instance.save()
+            transaction.on_commit(lambda: delete_files(names))
+    except Exception:
+        if instance.file:
+            # The blob's reference was rolled back; storage keeps it if
+            # other rows still point at it.
+            instance.file.delete(save=False)
+        raise
+    return instance
+
+
+def abort(session):
+    names = list(session.chunks.values_list('name', flat=True))
+    session.delete()
+    transaction.on_commit(lambda: delete_files(names))
+
+
+def delete_files(names, storage=default_storage):
+    for name in names:
+        storage.delete(name)
+
+
+def collect_garbage(ttl=None, now=None):
+    """
+    Delete sessions idle for longer than ``ttl`` with their chunks, and chunk
+    files of that age no session refers to (left behind by a crash between
+    storing a chunk and recording it). Returns ``(sessions, files)`` deleted.
+    """
+    ttl = ttl if ttl is not None else timedelta(seconds=getattr(settings, 'UPLOAD_SESSION_TTL', 24 * 3600))
+    cutoff = (now or timezone.now()) - ttl
+    stale = UploadSession.objects.filter(updated_at__lt=cutoff)
+    names = list(UploadChunk.objects.filter(session__in=stale).values_list('name', flat=True))
+    _, deleted = stale.delete()
+    delete_files(names)
+
+    orphans = 0
+    if default_storage.exists(CHUNK_PREFIX):
+        known = set(UploadChunk.objects.values_list('name', flat=True))
+        for filename in default_storage.listdir(CHUNK_PREFIX)[1]:
+            name = f'{CHUNK_PREFIX}/{filename}'
+            if name not in known and default_storage.get_modified_time(name) < cutoff:
+                default_storage.delete(name)
+                orphans += 1
+    return deleted.get(UploadSession._meta.label, 0), len(names) + orphans
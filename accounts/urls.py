@@ -1,37 +1,81 @@
 from django.urls import path
 
+from .async_views import (
+    AsyncProfileListView, AsyncProjectBoardView, AsyncProjectListView,
+    AsyncProjectMessageListView, AsyncTaskMessageListView
+)
 from .views import (
-    RegisterView, LoginView, ProtectedResourceView, GetUserProfiles,
+    RegisterView, LoginView, RefreshView, ProtectedResourceView, GetUserProfiles, ProfileSearchView,
 
     ProjectListView, ProjectDetailView, StatusListView, StatusDetailView,
     TaskListView, TaskDetailView, ContactListView, ContactCreateDeleteView,
-    ProjectMemberListView, ProjectMessageListView, ProjectMessageDetailView,
+    ContactImportView, MutualContactListView, ProjectPeopleListView, ContactSuggestionListView,
+    ProjectMemberListView, ProjectMemberBulkView, ProjectMessageListView, ProjectMessageDetailView,
     ProjectFileListView, ProjectFileDetailView, TaskMessageListView,
-    TaskMessageDetailView, TaskFileListView, TaskFileDetailView
+    TaskMessageDetailView, TaskFileListView, TaskFileDetailView,
+    ProjectBoardView, ProjectStatsView, TaskBulkView, ProjectExportView,
+    UploadSessionListView, UploadSessionDetailView, UploadChunkView, UploadCompleteView,
+    ProjectFileDownloadView, TaskFileDownloadView, ProfileThumbnailView, SearchView,
+    ActivityFeedView
 )
 
 
 urlpatterns = [
     path('profile/', GetUserProfiles.as_view(), name='profile'),
+    path('profiles/search/', ProfileSearchView.as_view(), name='profile-search'),
+    path('profiles/<int:pk>/avatar/<int:size>/', ProfileThumbnailView.as_view(), name='profile-avatar'),
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
+    path('token/refresh/', RefreshView.as_view(), name='token-refresh'),
     path('', ProtectedResourceView.as_view(), name='resource'),
 
+    path('search/', SearchView.as_view(), name='search'),
+    path('activity/', ActivityFeedView.as_view(), name='activity-feed'),
+
     path('projects/', ProjectListView.as_view(), name='project-list'),
     path('projects/<int:pk>/', ProjectDetailView.as_view(), name='project-detail'),
+    path('projects/<int:project_id>/board/', ProjectBoardView.as_view(), name='project-board'),
+    path('projects/<int:project_id>/export/', ProjectExportView.as_view(), name='project-export'),
+    path('projects/<int:project_id>/stats/', ProjectStatsView.as_view(), name='project-stats'),
     path('projects/<int:project_id>/status/', StatusListView.as_view(), name='status-list'),
     path('projects/<int:project_id>/status/<int:pk>/', StatusDetailView.as_view(), name='status-detail'),
     path('projects/<int:project_id>/tasks/', TaskListView.as_view(), name='task-list'),
+    path('projects/<int:project_id>/tasks/bulk/', TaskBulkView.as_view(), name='task-bulk'),
     path('projects/<int:project_id>/tasks/<int:pk>/', TaskDetailView.as_view(), name='task-detail'),
     path('contacts/', ContactListView.as_view(), name='contact-list'),
+    # Before contacts/<username>/, which they shadow for these three names.
+    path('contacts/import/', ContactImportView.as_view(), name='contact-import'),
+    path('contacts/suggestions/', ContactSuggestionListView.as_view(), name='contact-suggestions'),
+    path('contacts/from-projects/', ProjectPeopleListView.as_view(), name='contact-project-people'),
     path('contacts/<str:username>/', ContactCreateDeleteView.as_view(), name='contact-create-delete'),
+    path('contacts/<str:username>/mutual/', MutualContactListView.as_view(), name='contact-mutual'),
     path('projects/<int:project_id>/members/', ProjectMemberListView.as_view(), name='project-member-list'),
+    path('projects/<int:project_id>/members/bulk/', ProjectMemberBulkView.as_view(), name='project-member-bulk'),
     path('projects/<int:project_id>/messages/', ProjectMessageListView.as_view(), name='project-message-list'),
     path('projects/<int:project_id>/messages/<int:pk>/', ProjectMessageDetailView.as_view(), name='project-message-detail'),
     path('projects/<int:project_id>/files/', ProjectFileListView.as_view(), name='project-file-list'),
     path('projects/<int:project_id>/files/<int:pk>/', ProjectFileDetailView.as_view(), name='project-file-detail'),
+    path('projects/<int:project_id>/files/<int:pk>/download/', ProjectFileDownloadView.as_view(),
+         name='project-file-download'),
     path('projects/<int:project_id>/tasks/<int:task_id>/messages/', TaskMessageListView.as_view(), name='task-message-list'),
     path('projects/<int:project_id>/tasks/<int:task_id>/messages/<int:pk>/', TaskMessageDetailView.as_view(), name='task-message-detail'),
     path('projects/<int:project_id>/tasks/<int:task_id>/files/', TaskFileListView.as_view(), name='task-file-list'),
     path('projects/<int:project_id>/tasks/<int:task_id>/files/<int:pk>/', TaskFileDetailView.as_view(), name='task-file-detail'),
+    path('projects/<int:project_id>/tasks/<int:task_id>/files/<int:pk>/download/', TaskFileDownloadView.as_view(),
+         name='task-file-download'),
+    path('projects/<int:project_id>/uploads/', UploadSessionListView.as_view(), name='upload-list'),
+    path('projects/<int:project_id>/uploads/<uuid:pk>/', UploadSessionDetailView.as_view(), name='upload-detail'),
+    path('projects/<int:project_id>/uploads/<uuid:pk>/chunks/<int:index>/', UploadChunkView.as_view(),
+         name='upload-chunk'),
+    path('projects/<int:project_id>/uploads/<uuid:pk>/complete/', UploadCompleteView.as_view(),
+         name='upload-complete'),
+
+    # ASGI-native versions of the read-heavy endpoints above.
+    path('async/profile/', AsyncProfileListView.as_view(), name='async-profile'),
+    path('async/projects/', AsyncProjectListView.as_view(), name='async-project-list'),
+    path('async/projects/<int:project_id>/board/', AsyncProjectBoardView.as_view(), name='async-project-board'),
+    path('async/projects/<int:project_id>/messages/', AsyncProjectMessageListView.as_view(),
+         name='async-project-message-list'),
+    path('async/projects/<int:project_id>/tasks/<int:task_id>/messages/', AsyncTaskMessageListView.as_view(),
+         name='async-task-message-list'),
 ]
@@ -1,26 +1,46 @@
 from django.contrib.auth.models import User
 from rest_framework import generics, status
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny, IsAuthenticated
 status_ = status
 from rest_framework.views import APIView
-from django.db.models import Q
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 
 from django.contrib.auth import authenticate
+from django.http import StreamingHttpResponse
 from rest_framework.response import Response
+from rest_framework_simplejwt.views import TokenRefreshView
+from . import contacts, directory, search, uploads
+from .bulk import apply_member_changes, apply_task_operations
+from .caching import PROFILES, CachedResponseMixin, user_projects_scope
+from .conditional import ConditionalMixin
+from .downloads import serve_file
+from .mixins import EagerLoadingViewMixin
+from .streaming import streaming_content
+from .thumbnails import ThumbnailView
+from .transfer import buffered, export_lines
+from .permissions import IsProjectMember, IsProjectOwnerOrMemberReadOnly
+from .pagination import (
+    ActivityCursorPagination, MessageCursorPagination, ProfileCursorPagination, ProfileSearchPagination,
+    ProjectCursorPagination, SearchPagination, TaskCursorPagination
+)
 from .models import (
     Project, Status, Task,
     Contact, ProjectMessage,
     ProjectFile, TaskMessage,
     TaskFile, Profile,
-    ProjectMember
+    ProjectMember, PerformerCounter, UploadSession, ActivityEvent
 )
 from .serializers import (
     UserProfileSerializer, TokenSerializer,
     ProjectSerializer, StatusSerializer, TaskSerializer,
     ContactSerializer, ProjectFileSerializer, TaskFileSerializer,
-    ProjectMessageSerializer, TaskMessageSerializer, ProfileSerializer
+    ProjectMessageSerializer, TaskMessageSerializer, ProfileSerializer,
+    BoardSerializer, PerformerCounterSerializer, ActivityEventSerializer,
+    UploadChunkSerializer, UploadSessionSerializer, ClaimsTokenRefreshSerializer,
+    ContactSuggestionSerializer
 )
 
 
@@ -29,18 +49,14 @@ class RegisterView(generics.CreateAPIView):
     permission_classes = [AllowAny]
 
     def post(self, request, *args, **kwargs):
-        print(request.data)
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
             profile = serializer.save()
 
-            username = request.data.get('username')
-            password = request.data.get('password')
-
-            user = authenticate(username=username, password=password)
-
+            # The password was hashed by create_user; authenticating again
+            # would hash it a second time.
             token_serializer = TokenSerializer()
-            tokens = token_serializer.get_tokens_for_user(user)
+            tokens = token_serializer.get_tokens_for_user(profile.user, profile)
             return Response(tokens|{
 
                     "username": profile.user.username,
@@ -63,10 +79,10 @@ class LoginView(generics.GenericAPIView):
         user = authenticate(username=username, password=password)
 
         if user is not None:
+            profile = Profile.objects.get(user=user)
             token_serializer = self.serializer_class()
-            tokens = token_serializer.get_tokens_for_user(user)
+            tokens = token_serializer.get_tokens_for_user(user, profile)
 
-            profile = Profile.objects.get(user=user)
             profile_data = {
                 'username': user.username,
                 'first_name': profile.first_name,
@@ -78,16 +94,47 @@ class LoginView(generics.GenericAPIView):
             return Response({"error": "Invalid credentials"}, status=400)
 
 
-class GetUserProfiles(generics.ListAPIView):
-    serializer_class = UserProfileSerializer
+class RefreshView(TokenRefreshView):
+    """Access tokens for refresh tokens without a user lookup (see accounts.authentication.refresh_tokens)."""
+    serializer_class = ClaimsTokenRefreshSerializer
+
+
+class ProfileThumbnailView(ThumbnailView):
+    queryset = Profile.objects.all()
+
+
+class GetUserProfiles(CachedResponseMixin, EagerLoadingViewMixin, generics.ListAPIView):
+    serializer_class = ProfileSerializer
     permission_classes = [AllowAny]
+    pagination_class = ProfileCursorPagination
     queryset = Profile.objects.all()
+    cache_per_user = False
+
+    def get_cache_scopes(self):
+        return [PROFILES]
 
     def get(self, request, *args, **kwargs):
         result = super().get(request, *args, **kwargs)
         return result
 
 
+class ProfileSearchView(generics.ListAPIView):
+    """
+    Type-ahead search over usernames and names: ``?q=jo sm`` finds profiles
+    with a word starting with "jo" and one starting with "sm", in term order.
+    """
+    serializer_class = ProfileSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = ProfileSearchPagination
+
+    def list(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'This parameter is required.'})
+        rows = self.paginate_queryset(directory.matches(query).select_related('profile__user'))
+        return self.get_paginated_response(self.get_serializer([row.profile for row in rows], many=True).data)
+
+
 class ProtectedResourceView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -98,9 +145,13 @@ class ProtectedResourceView(APIView):
         })
 
 
-class ProjectListView(generics.ListCreateAPIView):
+class ProjectListView(CachedResponseMixin, generics.ListCreateAPIView):
     serializer_class = ProjectSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ProjectCursorPagination
+
+    def get_cache_scopes(self):
+        return [user_projects_scope(self.request.user.profile.pk)]
 
     def get_queryset(self):
         user = self.request.user.profile
@@ -110,10 +161,24 @@ class ProjectListView(generics.ListCreateAPIView):
         serializer.save(owner=self.request.user.profile)
 
 
-class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProjectDetailView(ConditionalMixin, CachedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ProjectSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_validator_aggregates(self):
+        # Counter columns are updated without touching updated_at.
+        return super().get_validator_aggregates() | {
+            'tasks': Sum('task_count'), 'messages': Sum('message_count'), 'files': Sum('file_count'),
+        }
+
+    def get_cache_scopes(self):
+        return [user_projects_scope(self.request.user.profile.pk)]
+
+    def get_cache_variants(self):
+        # A body cached under an older validator must not be served with a newer one.
+        etag, _ = self.validators
+        return [etag]
+
     def get_queryset(self):
         user = self.request.user.profile
         return Project.objects.filter(Q(owner=user) | Q(members=user)).distinct()
@@ -133,7 +198,7 @@ class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 class StatusListView(generics.ListCreateAPIView):
     serializer_class = StatusSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsProjectMember]
 
     def get_queryset(self):
         project_id = self.kwargs.get('project_id')
@@ -142,7 +207,7 @@ class StatusListView(generics.ListCreateAPIView):
 
 class StatusDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = StatusSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsProjectMember]
 
     def get_queryset(self):
         project_id = self.kwargs.get('project_id')
@@ -162,13 +227,14 @@ class StatusDetailView(generics.RetrieveUpdateDestroyAPIView):
         project_id = self.kwargs.get('project_id')
         return self.destroy(request, *args, **kwargs)
 
-class TaskListView(generics.ListCreateAPIView):
+class TaskListView(ConditionalMixin, generics.ListCreateAPIView):
     serializer_class = TaskSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsProjectMember]
+    pagination_class = TaskCursorPagination
 
     def get_queryset(self):
         project_id = self.kwargs['project_id']
-        return Task.objects.filter(project_id=project_id).order_by('status')
+        return Task.objects.filter(status__project_id=project_id)
 
     def perform_create(self, serializer):
 
@@ -191,20 +257,94 @@ class TaskListView(generics.ListCreateAPIView):
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
-class TaskDetailView(generics.RetrieveUpdateDestroyAPIView):
+def body_fields(request):
+    """The parsed body when it is an object, or an empty dict (a JSON array, say) so it fails validation."""
+    return request.data if isinstance(request.data, dict) else {}
+
+
+class TaskBulkView(APIView):
+    permission_classes = [IsProjectMember]
+    max_operations = 1000
+
+    def post(self, request, project_id):
+        operations = body_fields(request).get('operations')
+        if not isinstance(operations, list) or not operations:
+            return Response({"error": "'operations' must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(operations) > self.max_operations:
+            return Response({"error": f"At most {self.max_operations} operations per request"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        results, applied = apply_task_operations(project_id, request.user.profile, operations)
+        return Response({'results': results},
+                        status=status.HTTP_200_OK if applied else status.HTTP_400_BAD_REQUEST)
+
+
+class TaskDetailView(ConditionalMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = TaskSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsProjectMember]
 
     def get_queryset(self):
         project_id = self.kwargs['project_id']
-        return Task.objects.filter(project_id=project_id)
-class ContactListView(generics.ListAPIView):
+        return Task.objects.filter(status__project_id=project_id)
+class ContactListView(EagerLoadingViewMixin, generics.ListAPIView):
     serializer_class = ContactSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         return Contact.objects.filter(from_profile=self.request.user.profile)
 
+
+class ContactImportView(APIView):
+    permission_classes = [IsAuthenticated]
+    max_usernames = 5000
+
+    def post(self, request):
+        usernames = body_fields(request).get('usernames')
+        if not isinstance(usernames, list) or not usernames or not all(isinstance(name, str) for name in usernames):
+            return Response({"error": "'usernames' must be a non-empty list of usernames"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(usernames) > self.max_usernames:
+            return Response({"error": f"At most {self.max_usernames} usernames per request"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(contacts.import_contacts(request.user.profile.pk, usernames))
+
+
+class MutualContactListView(EagerLoadingViewMixin, generics.ListAPIView):
+    """Contacts the requesting user has in common with ``username``."""
+    serializer_class = ProfileSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = ProfileCursorPagination
+
+    def get_queryset(self):
+        other = get_object_or_404(Profile.objects.only('pk'), user__username=self.kwargs['username'])
+        return contacts.mutual_contacts(self.request.user.profile.pk, other.pk)
+
+
+class ProjectPeopleListView(EagerLoadingViewMixin, generics.ListAPIView):
+    """People sharing a project with the requesting user who are not among its contacts."""
+    serializer_class = ProfileSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = ProfileCursorPagination
+
+    def get_queryset(self):
+        return contacts.project_people(self.request.user.profile.pk)
+
+
+class ContactSuggestionListView(EagerLoadingViewMixin, generics.ListAPIView):
+    """The ``?limit=`` people sharing the most projects with the requesting user, not yet contacts."""
+    serializer_class = ContactSuggestionSerializer
+    permission_classes = [IsAuthenticated]
+    default_limit = 20
+    max_limit = 100
+
+    def get_queryset(self):
+        return contacts.suggestions(self.request.user.profile.pk)
+
+    def list(self, request, *args, **kwargs):
+        limit = request.query_params.get('limit', '')
+        limit = min(int(limit), self.max_limit) if limit.isdigit() else self.default_limit
+        queryset = self.filter_queryset(self.get_queryset())[:limit]
+        return Response(self.get_serializer(queryset, many=True).data)
+
 class ContactCreateDeleteView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -218,52 +358,63 @@ class ContactCreateDeleteView(APIView):
         Contact.objects.filter(from_profile=request.user.profile, to_profile=to_profile).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-class ProjectMemberListView(generics.ListCreateAPIView):
+class ProjectMemberListView(EagerLoadingViewMixin, generics.ListCreateAPIView):
     serializer_class = ProfileSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsProjectOwnerOrMemberReadOnly]
 
     def get_queryset(self):
         project_id = self.kwargs['project_id']
         return Profile.objects.filter(joined_projects__id=project_id)
 
-    def post(self, request, project_id, username, format=None):
-        project = Project.objects.get(id=project_id)
-        if project.owner == request.user.profile:
-            new_member = Profile.objects.get(user__username=username)
-            ProjectMember.objects.create(member=new_member, project=project)
-            return Response(status=status.HTTP_201_CREATED)
-        else:
-            raise PermissionDenied("You do not have permission to add members to this project.")
-
-    def delete(self, request, project_id, username, format=None):
-        project = Project.objects.get(id=project_id)
-        if project.owner == request.user.profile:
-            member = Profile.objects.get(user__username=username)
-            ProjectMember.objects.filter(member=member, project=project).delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        else:
-            raise PermissionDenied("You do not have permission to remove members from this project.")
+    def post(self, request, project_id, format=None):
+        new_member = get_object_or_404(Profile, user__username=request.data.get('username'))
+        ProjectMember.objects.get_or_create(member=new_member, project_id=project_id)
+        return Response(status=status.HTTP_201_CREATED)
+
+    def delete(self, request, project_id, format=None):
+        member = get_object_or_404(Profile, user__username=request.data.get('username'))
+        ProjectMember.objects.filter(member=member, project_id=project_id).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
-class ProjectMessageListView(generics.ListCreateAPIView):
+class ProjectMemberBulkView(APIView):
+    permission_classes = [IsProjectOwnerOrMemberReadOnly]
+    max_usernames = 1000
+
+    def post(self, request, project_id):
+        data = body_fields(request)
+        add, remove = data.get('add', []), data.get('remove', [])
+        if not all(isinstance(names, list) and all(isinstance(name, str) for name in names)
+                   for names in (add, remove)) or not (add or remove):
+            return Response({"error": "'add' and 'remove' must be lists of usernames, not both empty"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(add) + len(remove) > self.max_usernames:
+            return Response({"error": f"At most {self.max_usernames} usernames per request"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        both = sorted(set(add) & set(remove))
+        if both:
+            return Response({"error": "Usernames both added and removed", "usernames": both},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(apply_member_changes(project_id, add, remove))
+
+class ProjectMessageListView(ConditionalMixin, EagerLoadingViewMixin, generics.ListCreateAPIView):
     serializer_class = ProjectMessageSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsProjectMember]
+    pagination_class = MessageCursorPagination
+    last_modified_field = 'time_update'
 
     def get_queryset(self):
         project_id = self.kwargs['project_id']
-        user = self.request.user.profile
-        project = Project.objects.get(id=project_id)
-        if project.owner == user or user in project.members.all():
-            return ProjectMessage.objects.filter(project_id=project_id)
-        else:
-            raise PermissionDenied("You do not have permission to view messages for this project.")
+        return ProjectMessage.objects.filter(project_id=project_id)
 
     def perform_create(self, serializer):
         project_id = self.kwargs['project_id']
         serializer.save(author=self.request.user.profile, project_id=project_id)
 
-class ProjectMessageDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProjectMessageDetailView(ConditionalMixin, EagerLoadingViewMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ProjectMessageSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsProjectMember]
+    last_modified_field = 'time_update'
 
     def get_queryset(self):
         project_id = self.kwargs['project_id']
@@ -271,7 +422,7 @@ class ProjectMessageDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 class ProjectFileListView(generics.ListCreateAPIView):
     serializer_class = ProjectFileSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsProjectMember]
 
     def get_queryset(self):
         project_id = self.kwargs['project_id']
@@ -283,54 +434,258 @@ class ProjectFileListView(generics.ListCreateAPIView):
 
 class ProjectFileDetailView(generics.RetrieveDestroyAPIView):
     serializer_class = ProjectFileSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsProjectMember]
 
     def get_queryset(self):
         project_id = self.kwargs['project_id']
         return ProjectFile.objects.filter(project_id=project_id)
 
-class TaskMessageListView(generics.ListCreateAPIView):
+class FileDownloadMixin:
+    """Serve the file of the retrieved row instead of its JSON representation."""
+    http_method_names = ['get', 'head', 'options']
+
+    def perform_content_negotiation(self, request, force=False):
+        # Clients ask for the file's own type; errors still render as JSON.
+        return super().perform_content_negotiation(request, force=True)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return serve_file(request, instance.file, instance.filename)
+
+
+class ProjectFileDownloadView(FileDownloadMixin, ProjectFileDetailView):
+    pass
+
+
+def project_task(kwargs):
+    """The URL's task, provided it belongs to the URL's project."""
+    return get_object_or_404(Task, pk=kwargs['task_id'], status__project_id=kwargs['project_id'])
+
+
+class TaskMessageListView(ConditionalMixin, EagerLoadingViewMixin, generics.ListCreateAPIView):
     serializer_class = TaskMessageSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsProjectMember]
+    pagination_class = MessageCursorPagination
+    last_modified_field = 'time_update'
 
     def get_queryset(self):
         task_id = self.kwargs['task_id']
         project_id = self.kwargs['project_id']
-        user = self.request.user.profile
-        project = Project.objects.get(id=project_id)
-        if project.owner == user or user in project.members.all():
-            return TaskMessage.objects.filter(task_id=task_id)
-        else:
-            raise PermissionDenied("You do not have permission to view messages for this task.")
+        return TaskMessage.objects.filter(task_id=task_id, task__status__project_id=project_id)
 
     def perform_create(self, serializer):
-        task_id = self.kwargs['task_id']
-        serializer.save(author=self.request.user.profile, task_id=task_id)
+        task = project_task(self.kwargs)
+        serializer.save(author=self.request.user.profile, task=task)
 
-class TaskMessageDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TaskMessageDetailView(ConditionalMixin, EagerLoadingViewMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = TaskMessageSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsProjectMember]
+    last_modified_field = 'time_update'
 
     def get_queryset(self):
         task_id = self.kwargs['task_id']
-        return TaskMessage.objects.filter(task_id=task_id)
+        project_id = self.kwargs['project_id']
+        return TaskMessage.objects.filter(task_id=task_id, task__status__project_id=project_id)
 
 class TaskFileListView(generics.ListCreateAPIView):
     serializer_class = TaskFileSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsProjectMember]
 
     def get_queryset(self):
         task_id = self.kwargs['task_id']
-        return TaskFile.objects.filter(task_id=task_id)
+        project_id = self.kwargs['project_id']
+        return TaskFile.objects.filter(task_id=task_id, task__status__project_id=project_id)
 
     def perform_create(self, serializer):
-        task_id = self.kwargs['task_id']
-        serializer.save(task_id=task_id)
+        task = project_task(self.kwargs)
+        serializer.save(task=task)
 
 class TaskFileDetailView(generics.RetrieveDestroyAPIView):
     serializer_class = TaskFileSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsProjectMember]
 
     def get_queryset(self):
         task_id = self.kwargs['task_id']
-        return TaskFile.objects.filter(task_id=task_id)
+        project_id = self.kwargs['project_id']
+        return TaskFile.objects.filter(task_id=task_id, task__status__project_id=project_id)
+
+class TaskFileDownloadView(FileDownloadMixin, TaskFileDetailView):
+    pass
+
+
+class UploadSessionListView(generics.CreateAPIView):
+    """
+    Start a resumable upload of a project file, or of a task file when
+    ``task`` is given. Chunks are then PUT to ``chunks/<index>/`` and the
+    upload is finalized with ``complete/``.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsProjectMember]
+
+    def perform_create(self, serializer):
+        project_id = self.kwargs['project_id']
+        task = serializer.validated_data.get('task')
+        if task is not None and not Status.objects.filter(pk=task.status_id, project_id=project_id).exists():
+            raise ValidationError({'task': 'Task does not belong to this project.'})
+        serializer.save(owner=self.request.user.profile, project_id=project_id,
+                        chunk_size=uploads.chunk_size_setting())
+
+
+class UploadSessionDetailView(EagerLoadingViewMixin, generics.RetrieveDestroyAPIView):
+    """State of an upload (which chunks are stored) or, with DELETE, abort it."""
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsProjectMember]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(project_id=self.kwargs['project_id'], owner=self.request.user.profile)
+
+    def perform_destroy(self, instance):
+        uploads.abort(instance)
+
+
+class UploadChunkView(UploadSessionDetailView):
+    """
+    Store one chunk from the raw request body. It is streamed to storage, not
+    parsed, so send it as ``application/octet-stream``. An ``X-Chunk-Sha256``
+    header is verified, and lets a retry of an already stored chunk return
+    immediately.
+    """
+    http_method_names = ['put', 'options']
+
+    def put(self, request, project_id, pk, index):
+        session = self.get_object()
+        chunk, written = uploads.write_chunk(session, index, request.stream,
+                                             sha256=request.headers.get('X-Chunk-Sha256', '').lower())
+        return Response(UploadChunkSerializer(chunk).data,
+                        status=status.HTTP_201_CREATED if written else status.HTTP_200_OK)
+
+
+class UploadCompleteView(UploadSessionDetailView):
+    """Assemble the stored chunks into the file row."""
+    http_method_names = ['post', 'options']
+
+    def post(self, request, project_id, pk):
+        session = self.get_object()
+        missing = uploads.missing_chunks(session, [chunk.index for chunk in session.chunks.all()])
+        if missing:
+            return Response({'detail': 'Upload is incomplete.', 'missing': missing},
+                            status=status.HTTP_400_BAD_REQUEST)
+        instance = uploads.complete(session)
+        serializer_class = TaskFileSerializer if isinstance(instance, TaskFile) else ProjectFileSerializer
+        return Response(serializer_class(instance, context={'request': request}).data,
+                        status=status.HTTP_201_CREATED)
+
+
+def _count_subquery(model, field):
+    counts = (model.objects.filter(**{field: OuterRef('pk')})
+              .order_by().values(field).annotate(count=Count('pk')).values('count'))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def board_projects(profile):
+    return (Project.objects.filter(Q(owner=profile) | Q(members=profile)).distinct()
+            .select_related('owner__user')
+            .prefetch_related(Prefetch('statuses', queryset=Status.objects.order_by('id'))))
+
+
+def board_tasks(project_id):
+    return (Task.objects.filter(status__project_id=project_id)
+            .select_related('creator__user', 'performer__user')
+            .annotate(message_count=_count_subquery(TaskMessage, 'task'),
+                      file_count=_count_subquery(TaskFile, 'task'))
+            .order_by('created_at', 'id'))
+
+
+def board_members(project_id):
+    return Profile.objects.filter(joined_projects=project_id).select_related('user')
+
+
+def assemble_board(project, tasks, members):
+    by_status = {}
+    for task in tasks:
+        by_status.setdefault(task.status_id, []).append(task)
+    for column in project.statuses.all():
+        column.board_tasks = by_status.get(column.id, [])
+    project.board_members = list(members)
+    return project
+
+
+class ProjectBoardView(generics.RetrieveAPIView):
+    """Whole project board (columns, cards, members) in a fixed number of queries."""
+    serializer_class = BoardSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_object(self):
+        project = get_object_or_404(board_projects(self.request.user.profile), pk=self.kwargs['project_id'])
+        return assemble_board(project, board_tasks(project.pk), board_members(project.pk))
+
+
+class ProjectExportView(APIView):
+    """The whole project as NDJSON (see ``accounts.transfer``), streamed while it is read."""
+    permission_classes = [IsProjectMember]
+
+    def get(self, request, project_id):
+        response = StreamingHttpResponse(streaming_content(request, buffered(export_lines(project_id))),
+                                         content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="project-{project_id}.ndjson"'
+        return response
+
+
+class ProjectStatsView(APIView):
+    """Dashboard counters of a project, read from the denormalized counter columns."""
+    permission_classes = [IsProjectMember]
+
+    def get(self, request, project_id):
+        project = get_object_or_404(Project.objects.only('task_count', 'message_count', 'file_count'), pk=project_id)
+        statuses = Status.objects.filter(project_id=project_id).order_by('id')
+        performers = PerformerCounterSerializer.setup_eager_loading(
+            PerformerCounter.objects.filter(project_id=project_id, task_count__gt=0).order_by('-task_count'))
+        return Response({
+            'task_count': project.task_count,
+            'message_count': project.message_count,
+            'file_count': project.file_count,
+            'statuses': StatusSerializer(statuses, many=True).data,
+            'performers': PerformerCounterSerializer(performers, many=True, context={'request': request}).data,
+        })
+
+
+class ActivityFeedView(generics.ListAPIView):
+    """
+    Events of every project the user belongs to, newest first, optionally
+    narrowed to one project with ``?project=``.
+    """
+    serializer_class = ActivityEventSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = ActivityCursorPagination
+
+    def get_queryset(self):
+        profile = self.request.user.profile
+        projects = Project.objects.filter(Q(owner=profile) | Q(members=profile)).values('pk')
+        events = ActivityEvent.objects.filter(project_id__in=projects)
+        project = self.request.query_params.get('project')
+        if project:
+            events = events.filter(project_id=project) if project.isdigit() else events.none()
+        return events
+
+
+class SearchView(APIView):
+    """
+    Ranked full-text search over the tasks and messages of the projects the
+    user belongs to, optionally narrowed to one of them with ``?project=``.
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = SearchPagination
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'This parameter is required.'})
+        profile = request.user.profile
+        project_ids = set(Project.objects.filter(Q(owner=profile) | Q(members=profile))
+                          .values_list('pk', flat=True).distinct())
+        project = request.query_params.get('project')
+        if project:
+            project_ids &= {int(project)} if project.isdigit() else set()
+        paginator = self.pagination_class()
+        hits = paginator.paginate_hits(lambda limit, offset: search.search(query, project_ids, limit, offset), request)
+        return paginator.get_paginated_response(hits)
@@ -0,0 +1,95 @@
+"""
+Environment-driven database configuration.
+
+``DATABASE_URL`` selects the primary database (``postgres://`` or
+``sqlite:///``); without it the project runs on the tuned SQLite file next
+to ``manage.py``. ``DATABASE_REPLICA_URL`` adds a ``replica`` alias.
+"""
+
+import os
+from urllib.parse import parse_qsl, unquote, urlparse
+
+# Applied on every new SQLite connection. WAL lets readers proceed while a
+# writer commits, NORMAL sync is durable across application crashes in WAL
+# mode, and mmap avoids read() copies for hot pages.
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA temp_store=MEMORY',
+)
+
+# Seconds a connection waits on a locked database before raising
+# "database is locked" (sqlite3 busy_timeout).
+SQLITE_BUSY_TIMEOUT = 20
+
+POSTGRES_SCHEMES = {'postgres', 'postgresql', 'pgsql', 'postgis'}
+
+
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in {'1', 'true', 'yes', 'on'}
+
+
+def sqlite_config(path):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': SQLITE_BUSY_TIMEOUT,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ';'.join(SQLITE_PRAGMAS),
+        },
+    }
+
+
+def parse_database_url(url):
+    parsed = urlparse(url)
+    if parsed.scheme == 'sqlite':
+        path = unquote(parsed.path)
+        if parsed.netloc:
+            path = parsed.netloc + path
+        return sqlite_config(path or ':memory:')
+    if parsed.scheme not in POSTGRES_SCHEMES:
+        raise ValueError(f'Unsupported database URL scheme: {parsed.scheme!r}')
+
+    options = dict(parse_qsl(parsed.query))
+    config = {
+        'ENGINE': 'django.contrib.gis.db.backends.postgis' if parsed.scheme == 'postgis'
+        else 'django.db.backends.postgresql',
+        'NAME': unquote(parsed.path.lstrip('/')),
+        'USER': unquote(parsed.username or ''),
+        'PASSWORD': unquote(parsed.password or ''),
+        'HOST': parsed.hostname or '',
+        'PORT': str(parsed.port or ''),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': options,
+    }
+    if env_bool('DATABASE_POOL'):
+        # psycopg 3 connection pool; Django requires persistent connections
+        # to be disabled when the pool is in charge.
+        options['pool'] = {
+            'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DATABASE_POOL_MAX_SIZE', 10)),
+        }
+        config['CONN_MAX_AGE'] = 0
+    else:
+        config['CONN_MAX_AGE'] = int(os.environ.get('DATABASE_CONN_MAX_AGE', 60))
+    return config
+
+
+def database_config(base_dir):
+    """Build the ``DATABASES`` setting from the environment."""
+    url = os.environ.get('DATABASE_URL')
+    databases = {
+        'default': parse_database_url(url) if url else sqlite_config(base_dir / 'db.sqlite3'),
+    }
+    replica_url = os.environ.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        databases['replica'] = parse_database_url(replica_url)
+        databases['replica']['TEST'] = {'MIRROR': 'default'}
+    return databases
@@ -0,0 +1,91 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .routers import replica_configured, replica_reads
+
+
+def pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let safe requests to the views in ``REPLICA_READ_MODULES`` read from the
+    replica. A user who has just written is pinned to the primary for
+    ``REPLICA_PIN_SECONDS`` so they always read their own writes.
+
+    The pin lives in the default cache, which must be shared between worker
+    processes (e.g. Redis) for the guarantee to hold across them.
+
+    The middleware runs natively on both handler types so async views are
+    not pushed onto the single sync middleware thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.authentication = JWTAuthentication()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            token = request.__dict__.pop('_replica_reads_token', None)
+            if token is not None:
+                replica_reads.reset(token)
+        if self.should_pin(request, response):
+            cache.set(pin_key(request.user.pk), True, getattr(settings, 'REPLICA_PIN_SECONDS', 5))
+        return response
+
+    async def __acall__(self, request):
+        try:
+            response = await self.get_response(request)
+        finally:
+            # process_view ran through sync_to_async, so the token belongs to
+            # a copied context; every async request runs in its own task, so
+            # clearing the flag is enough.
+            if request.__dict__.pop('_replica_reads_token', None) is not None:
+                replica_reads.set(False)
+        if self.should_pin(request, response):
+            await cache.aset(pin_key(request.user.pk), True, getattr(settings, 'REPLICA_PIN_SECONDS', 5))
+        return response
+
+    def should_pin(self, request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return False
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_authenticated
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in SAFE_METHODS or not replica_configured():
+            return None
+        modules = getattr(settings, 'REPLICA_READ_MODULES', ('accounts.',))
+        if not view_func.__module__.startswith(tuple(modules)):
+            return None
+        user_id = self.token_user_id(request)
+        if user_id is not None and cache.get(pin_key(user_id)):
+            return None
+        request._replica_reads_token = replica_reads.set(True)
+        return None
+
+    def token_user_id(self, request):
+        """User id from the bearer token, without touching the database."""
+        header = self.authentication.get_header(request)
+        raw_token = self.authentication.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        try:
+            validated = self.authentication.get_validated_token(raw_token)
+        except (InvalidToken, TokenError):
+            return None
+        return validated.get(jwt_settings.USER_ID_CLAIM)
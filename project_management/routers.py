@@ -0,0 +1,37 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+REPLICA = 'replica'
+
+# Set by ReplicaRoutingMiddleware for the duration of a request whose reads
+# may be served by the replica.
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+class ReplicaRouter:
+    """
+    Send reads to the ``replica`` alias while ``replica_reads`` is set,
+    everything else (and reads inside a transaction) to ``default``.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not replica_reads.get() or not replica_configured():
+            return 'default'
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
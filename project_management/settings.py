@@ -10,9 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from datetime import timedelta
 from pathlib import Path
 
+from .database import database_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -57,6 +60,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'project_management.middleware.ReplicaRoutingMiddleware',
 ]
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:8080',
@@ -90,13 +94,54 @@ WSGI_APPLICATION = 'project_management.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
+# Configured from DATABASE_URL / DATABASE_REPLICA_URL, see database.py.
+
+DATABASES = database_config(BASE_DIR)
+
+DATABASE_ROUTERS = ['project_management.routers.ReplicaRouter']
+
+# Safe requests to these view modules read from the replica, unless the
+# user wrote something within the last REPLICA_PIN_SECONDS.
+REPLICA_READ_MODULES = ('accounts.',)
+REPLICA_PIN_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# REDIS_URL points at any Redis-protocol server; without it each process
+# keeps its own in-memory cache.
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Seconds a serialized list/detail response stays cached (see accounts/caching.py).
+RESPONSE_CACHE_TIMEOUT = 300
+
+
+# Real-time message events (see accounts/broker.py). The in-process broker
+# only reaches WebSockets served by the same process.
+REALTIME_BROKER = 'accounts.broker.RedisBroker' if REDIS_URL else 'accounts.broker.InProcessBroker'
+
+# Open WebSockets check their access again at least this often, besides on
+# membership changes and when their token expires (see accounts/consumers.py).
+WEBSOCKET_REAUTHORIZE_SECONDS = 300
+
+# Longest ?wait= a long-polling request to the async message lists may hold.
+ASYNC_LONG_POLL_SECONDS = 30
 
 
 # Password validation
@@ -117,9 +162,22 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing. New passwords use the first hasher; a login whose stored
+# hash came from another hasher (or another PBKDF2 iteration count) is
+# rehashed transparently. PASSWORD_HASHERS takes a comma-separated list of
+# hasher paths, e.g. to put Argon2 first once argon2-cffi is installed.
+PASSWORD_HASHERS = [path.strip() for path in os.environ.get('PASSWORD_HASHERS', '').split(',') if path.strip()] or [
+    'accounts.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 1_000_000))
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -134,6 +192,16 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
 
+# Seconds a process trusts its cached Profile.token_version; a revocation
+# takes at most this long to reach processes that do not share the cache.
+TOKEN_VERSION_CACHE_SECONDS = 60
+
+# The refresh endpoint also replaces a refresh token older than
+# TOKEN_REFRESH_SLIDE_AFTER, so active clients stay signed in until
+# TOKEN_REFRESH_MAX_AGE after their login.
+TOKEN_REFRESH_SLIDE_AFTER = timedelta(hours=12)
+TOKEN_REFRESH_MAX_AGE = timedelta(days=30)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
@@ -163,6 +231,56 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    # Project and task files, stored once per distinct content (see accounts/storage.py).
+    'files': {'BACKEND': 'accounts.storage.ContentAddressedStorage'},
+}
+
+# Project and task file downloads (see accounts/downloads.py). 'nginx' hands
+# the transfer over with X-Accel-Redirect to an internal location mapping
+# FILE_DOWNLOAD_ACCEL_PREFIX onto MEDIA_ROOT, 'sendfile' uses X-Sendfile
+# (Apache, lighttpd); unset streams the file from Django, which under ASGI
+# reads it chunk by chunk on a worker thread. Set it in production.
+FILE_DOWNLOAD_ACCEL = os.environ.get('FILE_DOWNLOAD_ACCEL') or None
+FILE_DOWNLOAD_ACCEL_PREFIX = '/protected-media/'
+
+# Resumable uploads (see accounts/uploads.py): chunk size handed to clients,
+# largest accepted file, and idle seconds before gc_uploads drops a session.
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+UPLOAD_MAX_SIZE = 5 * 1024 ** 3
+UPLOAD_SESSION_TTL = 24 * 3600
+
+# Image uploads (see accounts/thumbnails.py): longest side kept after
+# normalization and thumbnail sizes rendered after each upload.
+IMAGE_MAX_DIMENSION = 2048
+THUMBNAIL_SIZES = (48, 128, 256)
+
+# Full-text search (see accounts/search.py). None picks the SQLite FTS5
+# index on SQLite, the GIN-indexed backend on PostgreSQL and the unindexed
+# fallback on other databases.
+SEARCH_BACKEND = None
+
+# Activity feed (see accounts/activity.py): updates of one target by one
+# actor within ACTIVITY_COALESCE_SECONDS collapse into one event, and
+# trim_activity drops events past the age or per-project limits.
+ACTIVITY_COALESCE_SECONDS = 300
+ACTIVITY_RETENTION_DAYS = 90
+ACTIVITY_MAX_EVENTS_PER_PROJECT = 10000
+
+# Background jobs (see accounts/jobs.py, run with `manage.py run_worker`):
+# jobs run at once per worker, idle poll seconds, seconds before a running
+# job is considered abandoned, attempts before giving up, first retry delay
+# (doubling per attempt, capped), and how long finished jobs are kept.
+JOB_CONCURRENCY = 4
+JOB_POLL_INTERVAL = 1
+JOB_LOCK_TIMEOUT = 300
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 10
+JOB_RETRY_MAX_DELAY = 3600
+JOB_RETENTION = 7 * 24 * 3600
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
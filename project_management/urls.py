@@ -25,4 +25,7 @@ urlpatterns = [
     re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(), name='schema-json'),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+] + static(f'{settings.MEDIA_URL}avatars/', document_root=settings.MEDIA_ROOT / 'avatars')
+# Project and task files are only reachable through the authenticated
+# .../files/<id>/download/ endpoints.
+urlpatterns += static(f'{settings.MEDIA_URL}thumbnails/', document_root=settings.MEDIA_ROOT / 'thumbnails')